@@ -1,3 +1,7 @@
 from __future__ import absolute_import
 # Prevent typing multilevel imports
 from . import *
+from .graph import make_graphs
+from .incidence import save_incidence, load_incidence
+from .incidence import make_incidence_graphs
+from .voxelwise import voxel_graph, morton_encode, morton_decode
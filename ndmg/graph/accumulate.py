@@ -0,0 +1,247 @@
+#!/usr/bin/env python
+
+# Copyright 2016 NeuroData (http://neurodata.io)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# accumulate.py
+# Created by agent on 2026-10-17.
+# Email: agent@local
+
+from __future__ import print_function
+
+from tempfile import mkdtemp
+import numpy as np
+import os.path as op
+import shutil
+
+
+def encode(a, b):
+    """
+    Packs each pair of region labels into a single 64-bit key, with the first
+    label in the upper 32 bits. Labels must be non-negative and below 2^32.
+
+    **Positional Arguments:**
+
+            a, b:
+                - Region labels of each pair
+    """
+    a = np.asarray(a, dtype=np.uint64)
+    b = np.asarray(b, dtype=np.uint64)
+    return (a << np.uint64(32)) | b
+
+
+def decode(key):
+    """
+    Unpacks 64-bit keys into the pair of region labels they encode
+
+    **Positional Arguments:**
+
+            key:
+                - Keys, as returned by encode
+    """
+    key = np.asarray(key, dtype=np.uint64)
+    a = (key >> np.uint64(32)).astype(np.int64)
+    b = (key & np.uint64(0xFFFFFFFF)).astype(np.int64)
+    return a, b
+
+
+def reduce_keys(keys, counts, values=None):
+    """
+    Sums the counts of duplicate keys, returning sorted unique keys. Counts
+    are summed as integers so that merged results are exact.
+
+    **Positional Arguments:**
+
+            keys:
+                - Array of keys, possibly repeated
+            counts:
+                - Integer count of each key
+
+    **Optional Arguments:**
+
+            values:
+                - (len(keys), k) array of values which are summed alongside
+                  the counts
+    """
+    if len(keys) == 0:
+        if values is not None:
+            values = np.zeros((0, values.shape[1]))
+        return (np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.int64),
+                values)
+    order = np.argsort(keys, kind='mergesort')
+    keys = keys[order]
+    counts = counts[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    if values is not None:
+        values = np.add.reduceat(values[order], starts, axis=0)
+    return keys[starts], np.add.reduceat(counts, starts), values
+
+
+class accumulator(object):
+    def __init__(self, budget=2**28, tmpdir=None, nvalues=0):
+        """
+        Accumulates counts of unordered region pairs, each encoded as a single
+        64-bit key. Counts are buffered and periodically reduced; once the
+        reduced table outgrows the memory budget it is spilled to disk as a
+        sorted run, and runs are merged by key range when flushed.
+
+        **Optional Arguments:**
+
+                budget:
+                    - Approximate number of bytes of counts held in memory
+                tmpdir:
+                    - Directory in which spilled runs are written. Defaults
+                      to the system temporary directory.
+                nvalues:
+                    - Number of floating point values, such as streamline
+                      lengths, summed for each pair alongside its count
+        """
+        self.budget = budget
+        self.tmpdir = tmpdir
+        self.nvalues = nvalues
+        self.entry = 16 + 8 * nvalues
+        self.spilldir = None
+        self.runs = []
+        self.clear()
+        pass
+
+    def clear(self):
+        """
+        Discards all counts held in memory
+        """
+        self.keys = np.zeros(0, dtype=np.uint64)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.values = np.zeros((0, self.nvalues))
+        self.pending = []
+        self.nbytes = 0
+        pass
+
+    def add(self, a, b, w=None, values=None):
+        """
+        Adds counts for a set of region pairs
+
+        **Positional Arguments:**
+
+                a, b:
+                    - Region labels of each pair, with a < b
+
+        **Optional Arguments:**
+
+                w:
+                    - Count of each pair. Defaults to one per pair.
+                values:
+                    - (len(a), nvalues) array of values for each pair
+        """
+        key = encode(a, b)
+        if w is None:
+            w = np.ones(len(key), dtype=np.int64)
+        if values is None:
+            values = np.zeros((len(key), self.nvalues))
+        values = np.asarray(values, dtype=np.float64).reshape(len(key), -1)
+        if values.shape[1] != self.nvalues:
+            raise ValueError('Expected ' + str(self.nvalues) + ' values ' +
+                             'per pair, got ' + str(values.shape[1]))
+        self.pending.append((key, np.asarray(w, dtype=np.int64), values))
+        self.nbytes += self.entry * len(key)
+        if self.nbytes + self.entry * len(self.keys) > self.budget:
+            self.reduce()
+        pass
+
+    def reduce(self):
+        """
+        Merges buffered counts into the in-memory table, spilling the table
+        to disk if it exceeds half of the memory budget
+        """
+        if not self.pending:
+            return
+        keys = np.concatenate([self.keys] + [p[0] for p in self.pending])
+        counts = np.concatenate([self.counts] + [p[1] for p in self.pending])
+        values = np.concatenate([self.values] + [p[2] for p in self.pending])
+        self.pending = []
+        self.nbytes = 0
+        self.keys, self.counts, self.values = reduce_keys(keys, counts,
+                                                          values)
+        if self.entry * len(self.keys) > self.budget // 2:
+            self.spill()
+        pass
+
+    def spill(self):
+        """
+        Writes the in-memory table to disk as a sorted run
+        """
+        if len(self.keys) == 0:
+            return
+        if self.spilldir is None:
+            self.spilldir = mkdtemp(prefix='ndmg_edges_', dir=self.tmpdir)
+        base = op.join(self.spilldir, 'run%05d' % len(self.runs))
+        np.save(base + '_keys.npy', self.keys)
+        np.save(base + '_counts.npy', self.counts)
+        np.save(base + '_values.npy', self.values)
+        self.runs.append(base)
+        self.keys = np.zeros(0, dtype=np.uint64)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.values = np.zeros((0, self.nvalues))
+        pass
+
+    def merge_runs(self):
+        """
+        Merges the spilled runs, one key range at a time so that no more than
+        about half of the memory budget of partial counts is loaded at once
+        """
+        suffixes = ('_keys.npy', '_counts.npy', '_values.npy')
+        runs = [tuple(np.load(base + suffix, mmap_mode='r')
+                      for suffix in suffixes)
+                for base in self.runs]
+        total = sum(len(run[0]) for run in runs)
+        half = max(self.budget // 2, 1)
+        nparts = max(1, int(np.ceil(float(self.entry) * total / half)))
+
+        # Pick key ranges of roughly equal size from a sample of each run
+        sample = np.sort(np.concatenate([np.asarray(k[::max(1, len(k)//1000)])
+                                         for k, c, v in runs]))
+        picks = np.linspace(0, len(sample) - 1, nparts + 1).astype(np.int64)
+        bounds = list(np.unique(sample[picks[1:-1]])) + [None]
+
+        starts = [0] * len(runs)
+        merged = []
+        for hi in bounds:
+            parts = []
+            for idx, run in enumerate(runs):
+                k = run[0]
+                stop = len(k) if hi is None else np.searchsorted(k, hi)
+                parts.append([np.asarray(x[starts[idx]:stop]) for x in run])
+                starts[idx] = stop
+            merged.append(reduce_keys(*[np.concatenate(x)
+                                        for x in zip(*parts)]))
+        del runs
+        return tuple(np.concatenate(x) for x in zip(*merged))
+
+    def flush(self):
+        """
+        Returns every accumulated count as (a, b, w, values), sorted by pair,
+        and resets the accumulator
+        """
+        self.reduce()
+        if self.runs:
+            self.spill()
+            keys, counts, values = self.merge_runs()
+            shutil.rmtree(self.spilldir, ignore_errors=True)
+            self.spilldir = None
+            self.runs = []
+        else:
+            keys, counts, values = self.keys, self.counts, self.values
+        self.clear()
+        a, b = decode(keys)
+        return a, b, counts, values
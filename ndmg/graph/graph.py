@@ -21,9 +21,13 @@
 
 from __future__ import print_function
 
-from itertools import combinations
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
+from ndmg.graph.streamlines import iter_chunks, chunk_edges
+from ndmg.graph.parallel import parallel_edges
+from ndmg.graph.accumulate import accumulator
+from ndmg.utils.sparse_graph import sparse_graph, save_sparse_graph
 import numpy as np
+import scipy.sparse as sp
 import networkx as nx
 import nibabel as nb
 import ndmg
@@ -31,7 +35,8 @@ import time
 
 
 class graph(object):
-    def __init__(self, N, rois, attr=None):
+    def __init__(self, N, rois, attr=None, sparse=False, budget=2**28,
+                 tmpdir=None):
         """
         Initializes the graph with nodes corresponding to the number of ROIs
 
@@ -46,29 +51,58 @@ class graph(object):
                       will be interpretted as a graph attribute. If N
                       dimensional will be interpretted as node attributes. If
                       it is any other dimensional, it will be ignored.
+
+        **Optional Arguments:**
+
+                sparse:
+                    - Accumulates edges in a scipy.sparse matrix indexed by
+                      compact node IDs, and only builds a networkx graph
+                      when one is requested. Useful for very large
+                      parcellations.
+                budget:
+                    - Approximate number of bytes of partial edge counts held
+                      in memory before they are spilled to disk
+                tmpdir:
+                    - Directory for spilled edge counts
         """
         self.N = N
         self.edge_dict = defaultdict(int)
+        self.sparse = sparse
+        self.budget = budget
+        self.tmpdir = tmpdir
+        self.acc = accumulator(budget, tmpdir)
+        self.stat_names = []
+        self.sums = OrderedDict()
+        self.empty = True
 
-        self.rois = nb.load(rois).get_data()
+        if isinstance(rois, str):
+            rois = nb.load(rois).get_data()
+        self.rois = np.ascontiguousarray(rois)
         n_ids = np.unique(self.rois)
-        n_ids = n_ids[n_ids != 0]
-
-        self.g = nx.Graph(name="Generated by NeuroData's MRI Graphs (ndmg)",
-                          version=ndmg.version,
-                          date=time.asctime(time.localtime()),
-                          source="http://m2g.io",
-                          region="brain",
-                          sensor="Diffusion MRI",
-                          ecount=0,
-                          vcount=len(n_ids)
-                          )
-        print(self.g.graph)
-
-        [self.g.add_node(ids) for ids in n_ids]
+        self.n_ids = n_ids[n_ids != 0]
+
+        self.attr = dict(name="Generated by NeuroData's MRI Graphs (ndmg)",
+                         version=ndmg.version,
+                         date=time.asctime(time.localtime()),
+                         source="http://m2g.io",
+                         region="brain",
+                         sensor="Diffusion MRI",
+                         ecount=0,
+                         vcount=len(self.n_ids)
+                         )
+        print(self.attr)
+
+        if self.sparse:
+            n = len(self.n_ids)
+            self.adj = sp.csr_matrix((n, n), dtype=np.int64)
+        else:
+            self.g = nx.Graph(**self.attr)
+            [self.g.add_node(ids) for ids in self.n_ids]
         pass
 
-    def make_graph(self, streamlines, attr=None):
+    def make_graph(self, streamlines, attr=None, workers=1, chunk_size=10000,
+                   lengths=False, scalars=None, endpoints=False, radius=0,
+                   exact=False):
         """
         Takes streamlines and produces a graph
 
@@ -76,48 +110,186 @@ class graph(object):
 
                 streamlines:
                     - Fiber streamlines either file or array in a dipy EuDX
-                      or compatible format.
-        """
-        nlines = np.shape(streamlines)[0]
-        print("# of Streamlines: " + str(nlines))
-
-        for idx, streamline in enumerate(streamlines):
-            if (idx % int(nlines*0.05)) == 0:
-                print(idx)
-
-            points = np.round(streamline).astype(int)
-            p = set()
-            for point in points:
-                try:
-                    loc = self.rois[point[0], point[1], point[2]]
-                except IndexError:
-                    pass
-                else:
-                    pass
-
-                if loc:
-                    p.add(loc)
-
-            edges = combinations(p, 2)
-            for edge in edges:
-                lst = tuple([int(node) for node in edge])
-                self.edge_dict[tuple(sorted(lst))] += 1
-
-        edge_list = [(k[0], k[1], v) for k, v in self.edge_dict.items()]
-        self.g.add_weighted_edges_from(edge_list)
+                      or compatible format. Any iterable, including a
+                      generator, may be given.
+
+        **Optional Arguments:**
+
+                workers:
+                    - Number of processes to split the streamlines across
+                chunk_size:
+                    - Number of streamlines held in memory at once
+                lengths:
+                    - Whether to store the total and mean streamline length
+                      of each edge
+                scalars:
+                    - Dictionary of scalar volumes (arrays or nifti files),
+                      such as {'fa': fa_map}, whose mean along the
+                      streamlines of each edge is stored
+                endpoints:
+                    - Whether to only connect the regions containing the two
+                      endpoints of each streamline, rather than every region
+                      it passes through
+                radius:
+                    - Search radius, in voxels, used to label endpoints which
+                      fall in the background
+                exact:
+                    - Whether to use every voxel crossed by the segments of
+                      each streamline, which keeps region crossings when
+                      streamlines are compressed or coarsely sampled
+        """
+        make_graphs([self], streamlines, workers=workers,
+                    chunk_size=chunk_size, lengths=lengths, scalars=scalars,
+                    endpoints=endpoints, radius=radius, exact=exact)
+        pass
+
+    def set_stats(self, names):
+        """
+        Chooses the statistics, beyond streamline counts, which are summed for
+        every edge. Must be called before any edges are added.
+
+        **Positional Arguments:**
+
+                names:
+                    - List of statistic names. 'length' is the streamline
+                      length; any other name is the mean of a scalar volume.
+        """
+        names = list(names)
+        if names == self.stat_names:
+            return
+        if not self.empty:
+            raise ValueError('Edge statistics must be chosen before any ' +
+                             'edges are added')
+        n = len(self.n_ids)
+        self.stat_names = names
+        self.sums = OrderedDict((name, sp.csr_matrix((n, n)))
+                                for name in names)
+        self.acc = accumulator(self.budget, self.tmpdir, len(names))
+        pass
+
+    def add_edges(self, a, b, w, values=None):
+        """
+        Adds streamline counts to the edges between pairs of regions. Counts
+        are accumulated as compact keys and only added to the graph when
+        flush_edges is called.
+
+        **Positional Arguments:**
+
+                a, b:
+                    - Region labels of each edge, with a < b
+                w:
+                    - Number of streamlines along each edge
+
+        **Optional Arguments:**
+
+                values:
+                    - (len(a), k) array of the sum of each statistic chosen
+                      with set_stats over the streamlines of each edge
+        """
+        self.acc.add(a, b, w, values)
+        self.empty = False
+        pass
+
+    def flush_edges(self):
+        """
+        Adds all accumulated streamline counts to the graph
+        """
+        a, b, w, values = self.acc.flush()
+        if len(w) == 0:
+            return
+
+        # Regions are mapped to compact node IDs, in sorted label order
+        n = len(self.n_ids)
+        rows = np.searchsorted(self.n_ids, a)
+        cols = np.searchsorted(self.n_ids, b)
+        for k, name in enumerate(self.stat_names):
+            self.sums[name] = self.sums[name] + sp.coo_matrix(
+                (values[:, k], (rows, cols)), shape=(n, n)).tocsr()
+
+        if self.sparse:
+            self.adj = self.adj + sp.coo_matrix((w, (rows, cols)),
+                                                shape=(n, n)).tocsr()
+            return
+
+        keys = [(int(i), int(j)) for i, j in zip(a, b)]
+        for k, v in zip(keys, w):
+            self.edge_dict[k] += int(v)
+
+        counts = np.array([self.edge_dict[k] for k in keys])
+        attrs = self.edge_attributes(rows, cols, counts)
+        edge_list = [(k[0], k[1], dict([('weight', int(counts[i]))] +
+                                       [(name, float(x[i]))
+                                        for name, x in attrs.items()]))
+                     for i, k in enumerate(keys)]
+        self.g.add_edges_from(edge_list)
         pass
 
+    def edge_attributes(self, rows, cols, counts):
+        """
+        Computes the statistics of a set of edges from their summed values.
+        Lengths give 'length_total' and 'length_mean' attributes, and a scalar
+        volume named 'fa' gives an 'fa_mean' attribute.
+
+        **Positional Arguments:**
+
+                rows, cols:
+                    - Compact node IDs of each edge
+                counts:
+                    - Number of streamlines along each edge
+        """
+        attrs = OrderedDict()
+        counts = np.maximum(counts, 1).astype(np.float64)
+        for name in self.stat_names:
+            total = np.asarray(self.sums[name][rows, cols]).ravel()
+            if name == 'length':
+                attrs['length_total'] = total
+                attrs['length_mean'] = total / counts
+            else:
+                attrs[name + '_mean'] = total / counts
+        return attrs
+
     def get_graph(self):
         """
-        Returns the graph object created
+        Returns the graph object created. With the sparse backend, a new
+        networkx graph is built from the adjacency matrix on every call.
         """
+        self.flush_edges()
+        if self.sparse:
+            return self.to_sparse_graph().to_networkx()
         try:
             return self.g
         except AttributeError:
             print("Error: the graph has not yet been defined.")
             pass
 
-    def save_graph(self, graphname, fmt='gpickle'):
+    def get_adjacency(self):
+        """
+        Returns the upper triangular adjacency matrix of the graph as a
+        scipy.sparse matrix, with nodes in sorted label order
+        """
+        self.flush_edges()
+        if self.sparse:
+            return self.adj
+        n = len(self.n_ids)
+        keys = list(self.edge_dict.keys())
+        a = np.searchsorted(self.n_ids, [k[0] for k in keys])
+        b = np.searchsorted(self.n_ids, [k[1] for k in keys])
+        w = [self.edge_dict[k] for k in keys]
+        return sp.coo_matrix((w, (a, b)), shape=(n, n),
+                             dtype=np.int64).tocsr()
+
+    def to_sparse_graph(self):
+        """
+        Returns the graph, with any edge statistics, as a sparse_graph
+        """
+        adj = self.get_adjacency()
+        adj.sort_indices()
+        coo = adj.tocoo()
+        attr = dict(self.attr, ecount=adj.nnz)
+        return sparse_graph(self.n_ids, adj, attr,
+                            self.edge_attributes(coo.row, coo.col, coo.data))
+
+    def save_graph(self, graphname, fmt='gpickle', compress=True):
         """
         Saves the graph to disk
 
@@ -129,21 +301,122 @@ class graph(object):
         **Optional Arguments:**
 
                 fmt:
-                    - Output graph format
+                    - Output graph format: gpickle, graphml, or npz. The npz
+                      format stores the upper triangle of the adjacency
+                      matrix as CSR arrays, and is read by loadGraphs
+                      without building a networkx graph.
+                compress:
+                    - Whether to compress npz graphs. Uncompressed graphs
+                      can be memory-mapped when loaded.
         """
-        self.g.graph['ecount'] = nx.number_of_edges(self.g)
+        if fmt == 'npz':
+            save_sparse_graph(graphname, self.to_sparse_graph(), compress)
+            return
+
+        g = self.get_graph()
+        g.graph['ecount'] = nx.number_of_edges(g)
         if fmt == 'gpickle':
-            nx.write_gpickle(self.g, graphname)
+            nx.write_gpickle(g, graphname)
         elif fmt == 'graphml':
-            nx.write_graphml(self.g, graphname)
+            nx.write_graphml(g, graphname)
         else:
-            raise ValueError('graphml is the only format currently supported')
+            raise ValueError('fmt must be one of gpickle, graphml, or npz')
         pass
 
     def summary(self):
         """
         User friendly wrapping and display of graph properties
         """
+        self.flush_edges()
         print("\n Graph Summary:")
+        if self.sparse:
+            print("Number of nodes: " + str(self.adj.shape[0]))
+            print("Number of edges: " + str(self.adj.nnz))
+            return
         print(nx.info(self.g))
         pass
+
+
+def make_graphs(graphs, streamlines, workers=1, chunk_size=10000,
+                lengths=False, scalars=None, endpoints=False, radius=0,
+                exact=False):
+    """
+    Builds several graphs, one per parcellation, from a single pass over the
+    streamlines. Points are converted to voxels once and every parcellation
+    is looked up from that shared set of voxels.
+
+    **Positional Arguments:**
+
+            graphs:
+                - List of graph objects whose label volumes share a shape
+            streamlines:
+                - Fiber streamlines in a dipy EuDX or compatible format. Any
+                  iterable, including a generator, may be given; it is
+                  consumed in chunks so it is never fully held in memory.
+
+    **Optional Arguments:**
+
+            workers:
+                - Number of processes to split the streamlines across. The
+                  label volumes are shared with each process rather than
+                  copied, and the result is identical to the serial one.
+            chunk_size:
+                - Number of streamlines held in memory (per process) at once
+            lengths:
+                - Whether to store the total and mean streamline length of
+                  each edge
+            scalars:
+                - Dictionary of scalar volumes (arrays or nifti files), such
+                  as {'fa': fa_map}, whose mean along the streamlines of each
+                  edge is stored. All statistics are gathered in the same
+                  pass over the streamlines as the edge counts.
+            endpoints:
+                - Whether to only connect the regions containing the two
+                  endpoints of each streamline. This needs one lookup per
+                  endpoint rather than one per point, and gives at most one
+                  edge per streamline.
+            radius:
+                - Search radius, in voxels, used to give endpoints which fall
+                  in the background the label of the nearest labelled voxel
+            exact:
+                - Whether to use every voxel crossed by the segments of each
+                  streamline, found by voxel traversal, rather than only the
+                  voxels containing its points. Needed when streamlines are
+                  compressed or sampled coarsely relative to the voxels.
+    """
+    shape = graphs[0].rois.shape
+    if any(g.rois.shape != shape for g in graphs):
+        raise ValueError('All label volumes must have the same shape')
+
+    names = ['length'] if lengths else []
+    vols = []
+    for name, vol in sorted((scalars or {}).items()):
+        if isinstance(vol, str):
+            vol = nb.load(vol).get_data()
+        if vol.shape[0:3] != shape[0:3]:
+            raise ValueError('Scalar volume ' + name + ' must have the ' +
+                             'same shape as the label volumes')
+        names.append(name)
+        vols.append(np.asarray(vol, dtype=np.float64))
+    for g in graphs:
+        g.set_stats(names)
+
+    chunks = iter_chunks(streamlines, chunk_size)
+    if workers > 1:
+        results = parallel_edges([g.rois for g in graphs], chunks, workers,
+                                 vols, lengths, endpoints, radius, exact)
+    else:
+        results = (chunk_edges(chunk, [g.rois for g in graphs], vols,
+                               lengths, endpoints, radius, exact)
+                   for chunk in chunks)
+
+    nlines = 0
+    for n, edges in results:
+        nlines += n
+        for g, e in zip(graphs, edges):
+            g.add_edges(*e)
+    print("# of Streamlines: " + str(nlines))
+
+    for g in graphs:
+        g.flush_edges()
+    pass
@@ -0,0 +1,336 @@
+#!/usr/bin/env python
+
+# Copyright 2016 NeuroData (http://neurodata.io)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# incidence.py
+# Created by agent on 2026-10-17.
+# Email: agent@local
+
+from __future__ import print_function
+
+from ndmg.graph.streamlines import iter_chunks, voxel_index, voxel_sets
+from ndmg.graph.streamlines import traverse
+from ndmg.utils.npz import load_npz, npy_writer, zip_arrays
+from tempfile import mkdtemp
+import numpy as np
+import scipy.sparse as sp
+import os.path as op
+import shutil
+
+
+def save_incidence(fname, streamlines, shape, chunk_size=10000, exact=False):
+    """
+    Saves the streamline by voxel incidence matrix of a set of streamlines,
+    as uncompressed CSR arrays which can be memory-mapped. Graphs for any
+    label volume of the same shape can then be built from it without
+    reloading the streamlines.
+
+    **Positional Arguments:**
+
+            fname:
+                - Filename for the incidence matrix (.npz)
+            streamlines:
+                - Iterable of streamlines in voxel coordinates
+            shape:
+                - Shape of the volume the streamlines were tracked in
+
+    **Optional Arguments:**
+
+            chunk_size:
+                - Number of streamlines held in memory at once
+            exact:
+                - Whether every voxel crossed by each streamline segment is
+                  stored, rather than only the voxels containing its points
+    """
+    # Only the number of voxels of each streamline is kept in memory; the
+    # voxels themselves are streamed to disk and packed into the archive
+    itype = np.int32 if np.prod(shape[0:3]) < 2**31 else np.int64
+    tmpdir = mkdtemp(prefix='.ndmg_incidence_', dir=op.dirname(fname) or '.')
+    try:
+        indices = npy_writer(op.join(tmpdir, 'indices.npy'), itype)
+        data = npy_writer(op.join(tmpdir, 'data.npy'), np.uint8)
+        counts = []
+        for points, offsets in iter_chunks(streamlines, chunk_size):
+            nlines = len(offsets) - 1
+            if exact:
+                sid, vox = voxel_sets(*traverse(points, offsets, shape))
+            else:
+                sid, vox = voxel_sets(voxel_index(points, shape), offsets)
+            counts.append(np.bincount(sid, minlength=nlines))
+            indices.write(vox)
+            data.write(np.ones(len(vox), dtype=np.uint8))
+        indices.close()
+        data.close()
+
+        counts = np.concatenate(counts) if counts else np.zeros(0, np.int64)
+        ptype = itype if indices.length < 2**31 else np.int64
+        indptr = np.zeros(len(counts) + 1, dtype=ptype)
+        np.cumsum(counts, out=indptr[1:])
+        np.save(op.join(tmpdir, 'indptr.npy'), indptr)
+        np.save(op.join(tmpdir, 'dims.npy'),
+                np.asarray(shape[0:3], dtype=np.int64))
+        zip_arrays(fname, tmpdir, ['indptr', 'indices', 'data', 'dims'])
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    print("Incidence of " + str(len(counts)) + " streamlines saved to " +
+          fname)
+    pass
+
+
+def load_incidence(fname, mmap=True):
+    """
+    Loads a streamline by voxel incidence matrix
+
+    **Positional Arguments:**
+
+            fname:
+                - Name of the incidence matrix file
+
+    **Optional Arguments:**
+
+            mmap:
+                - Whether to memory-map the matrix rather than read it
+
+    **Returns:**
+
+            inc:
+                - (streamlines, voxels) scipy.sparse CSR matrix
+            dims:
+                - Shape of the volume the voxels index into
+    """
+    arrays = load_npz(fname, mmap=mmap)
+    dims = tuple(int(d) for d in arrays['dims'])
+    nlines = len(arrays['indptr']) - 1
+    inc = sp.csr_matrix((arrays['data'], arrays['indices'], arrays['indptr']),
+                        shape=(nlines, int(np.prod(dims))))
+    return inc, dims
+
+
+def label_matrix(rois):
+    """
+    Builds the voxel to region mapping of a label volume, as a sparse matrix
+    with one column per (non-zero) label
+
+    **Positional Arguments:**
+
+            rois:
+                - Label volume
+
+    **Returns:**
+
+            lab:
+                - (voxels, regions) scipy.sparse CSR matrix
+            ids:
+                - Label of each region, in column order
+    """
+    flat = np.ascontiguousarray(rois).ravel()
+    vox = np.flatnonzero(flat)
+    ids, col = np.unique(flat[vox], return_inverse=True)
+    lab = sp.csr_matrix((np.ones(len(vox), dtype=np.int32),
+                         (vox, col.ravel())), shape=(len(flat), len(ids)))
+    return lab, ids
+
+
+def region_incidence(inc, rois, block=100000):
+    """
+    Finds the regions every streamline passes through, as the product of the
+    incidence matrix and the voxel to region mapping of a label volume. The
+    incidence matrix is multiplied a block of streamlines at a time, so that
+    a memory-mapped matrix is never read into memory in full.
+
+    **Positional Arguments:**
+
+            inc:
+                - Streamline by voxel incidence matrix
+            rois:
+                - Label volume
+
+    **Optional Arguments:**
+
+            block:
+                - Number of streamlines multiplied at once
+
+    **Returns:**
+
+            reg:
+                - Binary (streamlines, regions) scipy.sparse CSR matrix
+            ids:
+                - Label of each region, in column order
+    """
+    lab, ids = label_matrix(rois)
+    blocks = []
+    for start in range(0, inc.shape[0], block):
+        part = (inc[start:start + block].astype(np.int32) * lab).tocsr()
+        part.data[:] = 1
+        blocks.append(part)
+    if not blocks:
+        return sp.csr_matrix((0, len(ids)), dtype=np.int32), ids
+    return sp.vstack(blocks, format='csr'), ids
+
+
+def nest_regions(fine_rois, coarse_rois, tolerance=0.01):
+    """
+    Maps each region of a fine parcellation onto the region of a coarse
+    parcellation it lies within. A ValueError is raised unless the fine
+    parcellation has more regions, every fine region lies within a single
+    coarse region (or the background), and the coarse regions are covered by
+    fine regions, each up to a tolerance.
+
+    **Positional Arguments:**
+
+            fine_rois:
+                - Fine label volume
+            coarse_rois:
+                - Coarse label volume
+
+    **Optional Arguments:**
+
+            tolerance:
+                - Fraction of the voxels of a fine region, or of the coarse
+                  regions, which may break the nesting
+
+    **Returns:**
+
+            parent:
+                - Binary (fine regions, coarse regions) scipy.sparse matrix
+            ids:
+                - Label of each coarse region, in column order
+    """
+    fine, fine_ids = label_matrix(fine_rois)
+    coarse, ids = label_matrix(coarse_rois)
+    if len(fine_ids) <= len(ids):
+        raise ValueError('The fine label volume must have more regions ' +
+                         'than the coarse one')
+    overlap = (fine.T * coarse).tocsr()
+    size = np.asarray(fine.sum(axis=0)).ravel()
+    best = np.asarray(overlap.argmax(axis=1)).ravel()
+    inside = np.asarray(overlap.max(axis=1).todense()).ravel()
+    outside = size - np.asarray(overlap.sum(axis=1)).ravel()
+    # Fine regions map onto the coarse region they share the most voxels
+    # with, or onto none if they lie mostly in the background
+    hit = inside > outside
+    stray = size - np.maximum(inside, outside)
+    if np.any(stray > tolerance * size):
+        raise ValueError('Fine regions are not nested within single coarse ' +
+                         'regions')
+    labelled = np.asarray(coarse.sum(axis=0)).ravel().sum()
+    uncovered = labelled - np.asarray(overlap.sum()).ravel().sum()
+    if uncovered > tolerance * labelled:
+        raise ValueError('Coarse regions are not covered by fine regions')
+    rows = np.flatnonzero(hit)
+    parent = sp.csr_matrix((np.ones(len(rows), dtype=np.int32),
+                            (rows, best[hit])),
+                           shape=(len(fine_ids), len(ids)))
+    return parent, ids
+
+
+def coarsen(reg, fine_rois, coarse_rois, tolerance=0.01):
+    """
+    Derives the regions every streamline passes through in a coarse
+    parcellation from those of a finer, nested, parcellation (see
+    nest_regions), raising a ValueError if they are not nested.
+
+    **Positional Arguments:**
+
+            reg:
+                - Binary (streamlines, fine regions) matrix, as returned by
+                  region_incidence for the fine label volume
+            fine_rois:
+                - Fine label volume
+            coarse_rois:
+                - Coarse label volume
+
+    **Optional Arguments:**
+
+            tolerance:
+                - Fraction of voxels which may break the nesting
+
+    **Returns:**
+
+            reg:
+                - Binary (streamlines, coarse regions) scipy.sparse matrix
+            ids:
+                - Label of each coarse region, in column order
+    """
+    parent, ids = nest_regions(fine_rois, coarse_rois, tolerance)
+    reg = (reg.astype(np.int32) * parent).tocsr()
+    reg.data[:] = 1
+    return reg, ids
+
+
+def incidence_edges(reg, ids):
+    """
+    Counts the streamlines shared by every pair of regions
+
+    **Positional Arguments:**
+
+            reg:
+                - Binary (streamlines, regions) matrix
+            ids:
+                - Label of each region, in column order
+
+    **Returns:**
+
+            a, b, w:
+                - Region labels of each edge, with a < b, and the number of
+                  streamlines along it
+    """
+    reg = reg.astype(np.int64)
+    shared = sp.triu(reg.T * reg, k=1).tocoo()
+    ids = np.asarray(ids).astype(np.int64)
+    # Labels are sorted, so the upper triangle always has a < b
+    return ids[shared.row], ids[shared.col], shared.data
+
+
+def make_incidence_graphs(graphs, fname, nested=False):
+    """
+    Builds graphs from a saved incidence matrix rather than from streamlines
+
+    **Positional Arguments:**
+
+            graphs:
+                - List of graph objects whose label volumes share the shape
+                  of the incidence matrix
+            fname:
+                - Name of the incidence matrix file
+
+    **Optional Arguments:**
+
+            nested:
+                - Whether each label volume is nested within the one before
+                  it (ordered from fine to coarse), in which case each is
+                  derived from the previous one instead of the voxels.
+                  Volumes which are not nested are built from the voxels.
+    """
+    inc, dims = load_incidence(fname)
+    print("# of Streamlines: " + str(inc.shape[0]))
+    prev = None
+    for g in graphs:
+        if g.rois.shape[0:3] != dims:
+            raise ValueError('Label volumes must have the same shape as ' +
+                             'the incidence matrix')
+        reg = None
+        if nested and prev is not None:
+            try:
+                reg, ids = coarsen(prev[0], prev[1], g.rois)
+            except ValueError as e:
+                print(str(e) + "; building from voxels instead")
+        if reg is None:
+            reg, ids = region_incidence(inc, g.rois)
+        g.add_edges(*incidence_edges(reg, ids))
+        g.flush_edges()
+        prev = (reg, g.rois)
+    pass
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+
+# Copyright 2016 NeuroData (http://neurodata.io)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# parallel.py
+# Created by agent on 2026-10-17.
+# Email: agent@local
+
+from __future__ import print_function
+
+from ndmg.graph.streamlines import chunk_edges
+from ndmg.utils.pool import share_volume, view_volume, bounded_imap
+
+# Volumes as seen by each worker process, set by init_worker
+shared_rois = []
+shared_scalars = []
+shared_options = dict()
+
+
+def init_worker(volumes, scalars, options):
+    """
+    Views the shared label and scalar volumes as arrays within a worker
+    process, and records the remaining keyword arguments of chunk_edges
+    """
+    global shared_rois, shared_scalars, shared_options
+    shared_rois = [view_volume(vol) for vol in volumes]
+    shared_scalars = [view_volume(vol) for vol in scalars]
+    shared_options = options
+
+
+def shared_chunk_edges(chunk):
+    """
+    Counts the edges of every shared label volume for a chunk of streamlines
+
+    **Positional Arguments:**
+
+            chunk:
+                - Tuple of the points and offsets of the streamlines
+    """
+    return chunk_edges(chunk, shared_rois, shared_scalars, **shared_options)
+
+
+def parallel_edges(volumes, chunks, workers, scalars=None, lengths=False,
+                   endpoints=False, radius=0, exact=False, backlog=2):
+    """
+    Counts the edges of several label volumes across a pool of processes,
+    yielding the counts for each chunk of streamlines in order. Only a few
+    chunks per process are in flight at once, so the chunks may come from a
+    generator without being fully materialized.
+
+    **Positional Arguments:**
+
+            volumes:
+                - List of label volumes which share a shape
+            chunks:
+                - Iterable of (points, offsets) chunks of streamlines
+            workers:
+                - Number of processes to use
+
+    **Optional Arguments:**
+
+            scalars:
+                - List of scalar volumes, shared in the same way as the label
+                  volumes, whose means are gathered for each edge
+            lengths:
+                - Whether streamline lengths are gathered for each edge
+            endpoints:
+                - Whether only the endpoints of each streamline are connected
+            radius:
+                - Search radius, in voxels, for endpoints in the background
+            exact:
+                - Whether every voxel crossed by each segment is used
+            backlog:
+                - Number of chunks queued per process
+    """
+    shared = [share_volume(vol) for vol in volumes]
+    shared_s = [share_volume(vol) for vol in scalars or []]
+    options = dict(lengths=lengths, endpoints=endpoints, radius=radius,
+                   exact=exact)
+    return bounded_imap(shared_chunk_edges, chunks, workers, backlog,
+                        init_worker, (shared, shared_s, options))
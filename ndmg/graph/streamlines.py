@@ -0,0 +1,558 @@
+#!/usr/bin/env python
+
+# Copyright 2016 NeuroData (http://neurodata.io)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# streamlines.py
+# Created by agent on 2026-10-17.
+# Email: agent@local
+
+from __future__ import print_function
+
+from itertools import islice
+from ndmg.graph.accumulate import encode, decode, reduce_keys
+import numpy as np
+
+
+def concatenate(streamlines):
+    """
+    Joins a set of streamlines into a single array of points
+
+    **Positional Arguments:**
+
+            streamlines:
+                - Sequence of (n_i, 3) arrays of streamline coordinates
+
+    **Returns:**
+
+            points:
+                - (sum(n_i), 3) array of every streamline point
+            offsets:
+                - Array of length len(streamlines) + 1 such that the points of
+                  streamline i are points[offsets[i]:offsets[i+1]]
+    """
+    lengths = np.array([len(s) for s in streamlines], dtype=np.int64)
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    if offsets[-1] == 0:
+        return np.zeros((0, 3)), offsets
+    points = np.concatenate([np.reshape(s, (-1, 3))
+                             for s in streamlines if len(s)])
+    return points, offsets
+
+
+def iter_chunks(streamlines, chunk_size):
+    """
+    Consumes an iterable of streamlines in chunks, yielding each chunk as
+    concatenated points and offsets. Only one chunk is held at a time, so
+    generators of streamlines are never fully materialized. Streamlines which
+    are already stored concatenated, such as a fibers handle, provide their
+    own chunks.
+
+    **Positional Arguments:**
+
+            streamlines:
+                - Iterable of (n_i, 3) arrays of streamline coordinates
+            chunk_size:
+                - Maximum number of streamlines per chunk
+    """
+    if hasattr(streamlines, 'chunks'):
+        for chunk in streamlines.chunks(chunk_size):
+            yield chunk
+        return
+    it = iter(streamlines)
+    while True:
+        chunk = list(islice(it, chunk_size))
+        if not chunk:
+            return
+        yield concatenate(chunk)
+
+
+def voxel_index(points, shape):
+    """
+    Rounds points to their nearest voxel and returns the flat (C-ordered)
+    index of that voxel in a volume of the given shape. Points which fall
+    outside of the volume are given an index of -1.
+
+    **Positional Arguments:**
+
+            points:
+                - (P, 3) array of points in voxel coordinates
+            shape:
+                - Shape of the volume being indexed
+    """
+    dims = np.asarray(shape[0:3], dtype=np.int64)
+    vox = np.round(points).astype(np.int64)
+    inside = np.all((vox >= 0) & (vox < dims), axis=1)
+    idx = np.full(len(vox), -1, dtype=np.int64)
+    idx[inside] = np.ravel_multi_index(vox[inside].T, tuple(dims))
+    return idx
+
+
+def traverse(points, offsets, shape):
+    """
+    Finds every voxel crossed by the segments of each streamline, rather than
+    only those containing its points, with a 3D DDA vectorized over all
+    segments. Voxels are unit cubes centred on integer coordinates, as in
+    voxel_index, and consecutive voxels share a face, so region crossings are
+    kept however sparsely the streamlines are sampled.
+
+    **Positional Arguments:**
+
+            points:
+                - (P, 3) array of points in voxel coordinates
+            offsets:
+                - Streamline offsets into the points, as from concatenate
+            shape:
+                - Shape of the volume being indexed
+
+    **Returns:**
+
+            idx:
+                - Flat voxel index of every voxel along each streamline, in
+                  order, with -1 for voxels outside of the volume
+            offsets:
+                - Offsets of each streamline into idx
+    """
+    nlines = len(offsets) - 1
+    npts = np.diff(offsets)
+    sid = np.repeat(np.arange(nlines, dtype=np.int64), npts)
+    vox = np.round(points).astype(np.int64)
+
+    # Segments join consecutive points of the same streamline
+    seg = np.flatnonzero(sid[1:] == sid[:-1]) if len(sid) else sid
+    p0 = points[seg]
+    delta = points[seg + 1] - p0
+    step = vox[seg + 1] - vox[seg]
+    ncross = np.abs(step)
+
+    # Each segment crosses |step| voxel boundaries along each axis, each at a
+    # parameter t along the segment; crossings are ordered by t
+    counts = ncross.ravel()
+    which = np.repeat(np.arange(len(counts), dtype=np.int64), counts)
+    k = np.arange(len(which)) - np.repeat(np.cumsum(counts) - counts, counts)
+    cseg, ax = which // 3, which % 3
+    sgn = np.sign(step[cseg, ax])
+    t = ((vox[seg[cseg], ax] + sgn * (k + 0.5) - p0[cseg, ax]) /
+         delta[cseg, ax])
+    # Crossings are already grouped by segment, so a single stable sort of
+    # segment + t orders them, keeping axis order for exact ties
+    order = np.argsort(cseg + np.clip(t, 0, 1), kind='mergesort')
+    cseg, ax, sgn = cseg[order], ax[order], sgn[order]
+    moves = np.zeros((len(cseg), 3), dtype=np.int64)
+    moves[np.arange(len(cseg)), ax] = sgn
+
+    # Voxels follow from the first voxel of each streamline and the moves
+    csid = sid[seg[cseg]]
+    ncs = np.bincount(csid, minlength=nlines)
+    cstart = np.cumsum(ncs) - ncs
+    cum = np.concatenate((np.zeros((1, 3), dtype=np.int64),
+                          np.cumsum(moves, axis=0)))
+    first = np.zeros((nlines, 3), dtype=np.int64)
+    full = npts > 0
+    first[full] = vox[offsets[:-1][full]]
+    path = first[csid] + cum[1:] - cum[cstart[csid]]
+
+    counts = full.astype(np.int64) + ncs
+    new_offsets = np.zeros(nlines + 1, dtype=np.int64)
+    np.cumsum(counts, out=new_offsets[1:])
+    out = np.zeros((new_offsets[-1], 3), dtype=np.int64)
+    out[new_offsets[:-1][full]] = first[full]
+    pos = new_offsets[csid] + 1 + np.arange(len(csid)) - cstart[csid]
+    out[pos] = path
+    return voxel_index(out, shape), new_offsets
+
+
+def lookup(rois, idx):
+    """
+    Gets the label of every voxel in a flat index, with a single fancy-index
+    into the label volume. Indices of -1 are given the background label, 0.
+
+    **Positional Arguments:**
+
+            rois:
+                - Label volume, ideally C-contiguous to avoid a copy
+            idx:
+                - Flat voxel indices, as returned by voxel_index
+    """
+    labels = np.zeros(len(idx), dtype=np.int64)
+    inside = idx >= 0
+    labels[inside] = np.ascontiguousarray(rois).ravel()[idx[inside]]
+    return labels
+
+
+def voxel_sets(idx, offsets):
+    """
+    Finds the set of voxels each streamline passes through. Streamlines are
+    sampled far more finely than the voxel grid, so this is considerably
+    smaller than the set of points and can be shared between label volumes.
+
+    **Positional Arguments:**
+
+            idx:
+                - Flat voxel index of every point, as from voxel_index
+            offsets:
+                - Streamline offsets into the points, as from concatenate
+
+    **Returns:**
+
+            sid:
+                - Streamline id of each (streamline, voxel) pair, sorted
+            vox:
+                - Flat index of each voxel, sorted within each streamline
+    """
+    nlines = len(offsets) - 1
+    sid = np.repeat(np.arange(nlines, dtype=np.int64), np.diff(offsets))
+    keep = idx >= 0
+    sid = sid[keep]
+    vox = idx[keep]
+    if len(vox) == 0:
+        return sid, vox
+    nvox = int(vox.max()) + 1
+    key = np.unique(sid * nvox + vox)
+    return key // nvox, key % nvox
+
+
+def region_sets(sid, labels):
+    """
+    Finds the set of regions each streamline passes through by sorting and
+    de-duplicating (streamline, region) pairs, rather than building a set per
+    streamline.
+
+    **Positional Arguments:**
+
+            sid:
+                - Streamline id of every point or voxel
+            labels:
+                - Label of every point or voxel, where 0 is background
+
+    **Returns:**
+
+            sid:
+                - Streamline id of each (streamline, region) pair, sorted
+            region:
+                - Region of each pair, sorted within each streamline
+    """
+    keep = labels != 0
+    sid = sid[keep]
+    region = labels[keep]
+    if len(region) == 0:
+        return sid, region
+    nlab = int(region.max()) + 1
+    key = np.unique(sid * nlab + region)
+    return key // nlab, key % nlab
+
+
+def region_pairs(sid, region):
+    """
+    Expands the region set of every streamline into all of its unordered
+    region pairs, equivalent to itertools.combinations on each set.
+
+    **Positional Arguments:**
+
+            sid:
+                - Sorted streamline ids, as returned by region_sets
+            region:
+                - Regions, sorted within each streamline
+
+    **Returns:**
+
+            a, b:
+                - Endpoints of each pair, with a < b
+            pair_sid:
+                - Streamline id of each pair
+    """
+    m = len(sid)
+    pos = np.arange(m, dtype=np.int64)
+    # Each element pairs with every element after it in its own streamline
+    cnt = np.searchsorted(sid, sid, side='right') - pos - 1
+    first = np.repeat(pos, cnt)
+    block = np.repeat(np.cumsum(cnt) - cnt, cnt)
+    second = first + 1 + (np.arange(len(first), dtype=np.int64) - block)
+    return region[first], region[second], sid[first]
+
+
+def count_pairs(a, b, w=None, values=None):
+    """
+    Counts the occurences of each unique (a, b) pair, encoding each pair as
+    a single 64-bit key
+
+    **Positional Arguments:**
+
+            a, b:
+                - Endpoints of each pair
+
+    **Optional Arguments:**
+
+            w:
+                - Integer weight of each pair, used when merging counts which
+                  have already been partially reduced
+            values:
+                - (len(a), k) array of values summed for each unique pair
+
+    **Returns:**
+
+            a, b, w, values:
+                - Unique pairs, their counts, and their summed values (None
+                  if no values were given)
+    """
+    if w is None:
+        w = np.ones(len(a), dtype=np.int64)
+    key, counts, values = reduce_keys(encode(a, b),
+                                      np.asarray(w, dtype=np.int64), values)
+    a, b = decode(key)
+    return a, b, counts, values
+
+
+def streamline_lengths(points, offsets):
+    """
+    Computes the length of every streamline, in the units of its points
+
+    **Positional Arguments:**
+
+            points:
+                - Concatenated streamline points
+            offsets:
+                - Streamline offsets into the points, as from concatenate
+    """
+    seg = np.sqrt(np.sum(np.diff(points, axis=0) ** 2, axis=1))
+    cum = np.concatenate(([0], np.cumsum(seg)))
+    lengths = np.zeros(len(offsets) - 1)
+    full = np.diff(offsets) > 0
+    lengths[full] = cum[offsets[1:][full] - 1] - cum[offsets[:-1][full]]
+    return lengths
+
+
+def streamline_means(vol, idx, offsets):
+    """
+    Computes the mean of a scalar volume, such as FA, over the voxels of every
+    streamline. Voxels outside of the volume are ignored.
+
+    **Positional Arguments:**
+
+            vol:
+                - Scalar volume
+            idx:
+                - Flat voxel index of every point, as from voxel_index, or
+                  of every voxel crossed, as from traverse
+            offsets:
+                - Streamline offsets into idx
+    """
+    nlines = len(offsets) - 1
+    sid = np.repeat(np.arange(nlines, dtype=np.int64), np.diff(offsets))
+    inside = idx >= 0
+    vals = np.ascontiguousarray(vol).ravel()[idx[inside]]
+    sums = np.bincount(sid[inside], weights=vals, minlength=nlines)
+    npts = np.bincount(sid[inside], minlength=nlines)
+    return sums / np.maximum(npts, 1)
+
+
+def region_edges(rois, sid, vox, values=None):
+    """
+    Counts the streamlines shared by every pair of regions in a label volume,
+    given the set of voxels each streamline passes through
+
+    **Positional Arguments:**
+
+            rois:
+                - Label volume
+            sid:
+                - Streamline id of each (streamline, voxel) pair
+            vox:
+                - Flat voxel index of each pair, as from voxel_sets
+
+    **Optional Arguments:**
+
+            values:
+                - (nlines, k) array of per-streamline values, such as their
+                  lengths, summed over the streamlines of each edge
+    """
+    sid, region = region_sets(sid, lookup(rois, vox))
+    a, b, pair_sid = region_pairs(sid, region)
+    if values is not None:
+        values = values[pair_sid]
+    return count_pairs(a, b, values=values)
+
+
+def search_offsets(radius):
+    """
+    Lists the integer voxel offsets within a radius of the origin, nearest
+    first, so that the closest labelled voxel is found first when searching
+
+    **Positional Arguments:**
+
+            radius:
+                - Search radius, in voxels
+    """
+    r = int(np.floor(radius))
+    grid = np.mgrid[-r:r+1, -r:r+1, -r:r+1].reshape(3, -1).T
+    dist = np.sum(grid ** 2, axis=1)
+    keep = dist <= radius ** 2
+    order = np.argsort(dist[keep], kind='mergesort')
+    return grid[keep][order]
+
+
+def endpoint_voxels(points, offsets):
+    """
+    Finds the voxels containing the first and last point of every non-empty
+    streamline
+
+    **Positional Arguments:**
+
+            points:
+                - Concatenated streamline points
+            offsets:
+                - Streamline offsets into the points, as from concatenate
+
+    **Returns:**
+
+            sid:
+                - Streamline id of each non-empty streamline
+            ends:
+                - (2, len(sid), 3) array of the first and last voxel of each
+                  streamline
+    """
+    full = np.flatnonzero(np.diff(offsets) > 0)
+    first = points[offsets[:-1][full]]
+    last = points[offsets[1:][full] - 1]
+    ends = np.round(np.stack([first, last])).astype(np.int64)
+    return full, ends.reshape(2, len(full), 3)
+
+
+def endpoint_labels(rois, ends, radius=0):
+    """
+    Labels the endpoints of streamlines. Endpoints in the background are
+    given the label of the nearest labelled voxel within the search radius,
+    one offset at a time across every endpoint.
+
+    **Positional Arguments:**
+
+            rois:
+                - Label volume
+            ends:
+                - Array of endpoint voxels, as from endpoint_voxels
+
+    **Optional Arguments:**
+
+            radius:
+                - Search radius, in voxels
+    """
+    vox = ends.reshape(-1, 3)
+    labels = np.zeros(len(vox), dtype=np.int64)
+    for off in search_offsets(radius):
+        todo = np.flatnonzero(labels == 0)
+        if len(todo) == 0:
+            break
+        labels[todo] = lookup(rois, voxel_index(vox[todo] + off, rois.shape))
+    return labels.reshape(ends.shape[0:2])
+
+
+def endpoint_edges(rois, sid, ends, radius=0, values=None):
+    """
+    Counts the streamlines connecting every pair of regions in a label
+    volume, using only the regions in which each streamline starts and ends
+
+    **Positional Arguments:**
+
+            rois:
+                - Label volume
+            sid:
+                - Streamline id of each set of endpoints
+            ends:
+                - Endpoint voxels, as from endpoint_voxels
+
+    **Optional Arguments:**
+
+            radius:
+                - Search radius for endpoints in the background, in voxels
+            values:
+                - (nlines, k) array of per-streamline values, such as their
+                  lengths, summed over the streamlines of each edge
+    """
+    first, last = endpoint_labels(rois, ends, radius)
+    keep = (first != 0) & (last != 0) & (first != last)
+    a = np.minimum(first, last)[keep]
+    b = np.maximum(first, last)[keep]
+    if values is not None:
+        values = values[sid[keep]]
+    return count_pairs(a, b, values=values)
+
+
+def chunk_edges(chunk, volumes, scalars=None, lengths=False, endpoints=False,
+                radius=0, exact=False):
+    """
+    Counts the edges of several label volumes for one chunk of streamlines,
+    converting the streamline points to voxels only once. Per-edge statistics
+    are gathered in the same traversal.
+
+    **Positional Arguments:**
+
+            chunk:
+                - Tuple of the points and offsets of the streamlines
+            volumes:
+                - List of label volumes which share a shape
+
+    **Optional Arguments:**
+
+            scalars:
+                - List of scalar volumes, such as FA, whose mean along each
+                  streamline is summed for each edge
+            lengths:
+                - Whether streamline lengths are summed for each edge. If
+                  so, they are the first of the values.
+            endpoints:
+                - Whether only the regions containing the endpoints of each
+                  streamline are connected, rather than every region it
+                  passes through
+            radius:
+                - Search radius, in voxels, for endpoints in the background
+            exact:
+                - Whether every voxel crossed by each streamline segment is
+                  used, for both regions and scalar means, rather than only
+                  the voxels containing its points
+
+    **Returns:**
+
+            nlines:
+                - Number of streamlines in the chunk
+            edges:
+                - List of (a, b, w, values) edge counts and summed values,
+                  one per label volume
+    """
+    points, offsets = chunk
+    # Voxels of each streamline, from which both its scalar means and the
+    # regions it passes through are found
+    if scalars or not endpoints:
+        if exact:
+            idx, voffsets = traverse(points, offsets, volumes[0].shape)
+        else:
+            idx, voffsets = voxel_index(points, volumes[0].shape), offsets
+
+    values = []
+    if lengths:
+        values.append(streamline_lengths(points, offsets))
+    for vol in scalars or []:
+        values.append(streamline_means(vol, idx, voffsets))
+    values = np.column_stack(values) if values else None
+
+    if endpoints:
+        sid, ends = endpoint_voxels(points, offsets)
+        return (len(offsets) - 1,
+                [endpoint_edges(rois, sid, ends, radius, values)
+                 for rois in volumes])
+
+    sid, vox = voxel_sets(idx, voffsets)
+    return (len(offsets) - 1,
+            [region_edges(rois, sid, vox, values) for rois in volumes])
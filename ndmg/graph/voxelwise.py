@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+
+# Copyright 2016 NeuroData (http://neurodata.io)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# voxelwise.py
+# Created by agent on 2026-10-17.
+# Email: agent@local
+
+from __future__ import print_function
+
+from ndmg.graph.graph import graph
+import numpy as np
+import nibabel as nb
+
+# Bit masks which spread the low 21 bits of a coordinate to every third bit
+spread_masks = [(32, 0x1f00000000ffff), (16, 0x1f0000ff0000ff),
+                (8, 0x100f00f00f00f00f), (4, 0x10c30c30c30c30c3),
+                (2, 0x1249249249249249)]
+
+
+def spread_bits(v):
+    """
+    Spreads the low 21 bits of each value so that bit i moves to bit 3i
+    """
+    v = np.asarray(v).astype(np.uint64) & np.uint64(0x1fffff)
+    for shift, mask in spread_masks:
+        v = (v | (v << np.uint64(shift))) & np.uint64(mask)
+    return v
+
+
+def compact_bits(v):
+    """
+    Gathers every third bit of each value into its low 21 bits, undoing
+    spread_bits
+    """
+    shifts = [shift for shift, mask in reversed(spread_masks)]
+    masks = [mask for shift, mask in reversed(spread_masks[:-1])] + [0x1fffff]
+    v = np.asarray(v).astype(np.uint64) & np.uint64(spread_masks[-1][1])
+    for shift, mask in zip(shifts, masks):
+        v = (v | (v >> np.uint64(shift))) & np.uint64(mask)
+    return v
+
+
+def morton_encode(x, y, z):
+    """
+    Interleaves voxel coordinates into Morton (Z-order) codes, with x in the
+    lowest bit of each triple as in analysis/MortonXYZ.R. Coordinates must be
+    below 2^21.
+
+    **Positional Arguments:**
+
+            x, y, z:
+                - Voxel coordinates
+    """
+    return (spread_bits(x) | (spread_bits(y) << np.uint64(1)) |
+            (spread_bits(z) << np.uint64(2)))
+
+
+def morton_decode(code):
+    """
+    Recovers the voxel coordinates of Morton codes
+
+    **Positional Arguments:**
+
+            code:
+                - Morton codes, as returned by morton_encode
+    """
+    code = np.asarray(code).astype(np.uint64)
+    return tuple(compact_bits(code >> np.uint64(k)).astype(np.int64)
+                 for k in range(3))
+
+
+def morton_labels(mask, level=0):
+    """
+    Gives every voxel in a mask a label according to its Morton code, so
+    that labels are ordered along the Z-order curve. Codes are shifted by 3
+    bits per level, which merges each 2^level cube of voxels into one node.
+
+    **Positional Arguments:**
+
+            mask:
+                - Binary mask of the voxels to include
+
+    **Optional Arguments:**
+
+            level:
+                - Number of times to halve the resolution of the nodes
+
+    **Returns:**
+
+            labels:
+                - Label volume, where label i is the node with the i-th
+                  smallest Morton code and 0 is outside of the mask
+            codes:
+                - Sorted Morton code of each node, as a uint64 array
+    """
+    x, y, z = np.nonzero(np.asarray(mask))
+    codes = morton_encode(x, y, z) >> np.uint64(3 * level)
+    codes, inv = np.unique(codes, return_inverse=True)
+    labels = np.zeros(np.shape(mask)[0:3], dtype=np.int64)
+    labels[x, y, z] = inv.ravel() + 1
+    return labels, codes
+
+
+class voxel_graph(graph):
+    def __init__(self, mask, level=0, budget=2**28, tmpdir=None):
+        """
+        Voxel resolution graph, with a node for every voxel (or 2^level cube
+        of voxels) within a mask. Nodes are keyed by Morton code, and are
+        stored in Morton order so that the voxels of each streamline, and the
+        rows of the adjacency matrix, are sorted along the Z-order curve. The
+        sparse backend is always used.
+
+        **Positional Arguments:**
+
+                mask:
+                    - Binary mask of the voxels to include, as either an
+                      array or nifti file
+
+        **Optional Arguments:**
+
+                level:
+                    - Number of times to halve the resolution of the nodes,
+                      by shifting their Morton codes
+                budget:
+                    - Approximate number of bytes of partial edge counts held
+                      in memory before they are spilled to disk
+                tmpdir:
+                    - Directory for spilled edge counts
+        """
+        if isinstance(mask, str):
+            mask = nb.load(mask).get_data()
+        labels, self.codes = morton_labels(mask, level)
+        self.level = level
+        super(voxel_graph, self).__init__(len(self.codes), labels,
+                                          sparse=True, budget=budget,
+                                          tmpdir=tmpdir)
+        self.attr['region'] = 'voxelwise'
+        self.attr['morton_level'] = level
+        pass
+
+    def to_sparse_graph(self):
+        """
+        Returns the graph as a sparse_graph whose node IDs are Morton codes
+        """
+        g = super(voxel_graph, self).to_sparse_graph()
+        g.ids = self.codes[np.asarray(g.ids) - 1]
+        return g
@@ -25,6 +25,7 @@ import ndmg.utils.utils as mgu
 import nibabel as nb
 import numpy as np
 import nilearn.image as nl
+from ndmg.register.transforms import flirt_voxel_affine
 
 
 class register(object):
@@ -193,3 +194,76 @@ class register(object):
                            mprage_name, "*"])
             print("Cleaning temporary registration files...")
             mgu().execute_cmd(cmd)
+
+    def dti2atlas_native(self, dti, gtab, mprage, atlas, corrected_dti,
+                         outdir, clean=False):
+        """
+        Computes the transform from a DTI image to an atlas without
+        resampling the DTI volumes. Only the B0 volume is registered to the
+        MPRAGE, so that tensors can be fit and fibers tracked at the native
+        resolution and the streamlines then mapped to the atlas. Returns the
+        4x4 affine from voxel coordinates of the corrected DTI image to voxel
+        coordinates of the atlas.
+
+        **Positional Arguments:**
+
+                dti:
+                    - Input impage to be aligned as a nifti image file
+                gtab:
+                    - dipy formatted bval/bvec Structure
+                mprage:
+                    - Intermediate image being aligned to as a nifti image file
+                atlas:
+                    - Terminal image being aligned to as a nifti image file
+                corrected_dti:
+                    - Eddy-corrected dti image, in its native space, as a
+                      nifti image file
+        """
+        # Creates names for all intermediate files used
+        dti_name = mgu().get_filename(dti)
+        mprage_name = mgu().get_filename(mprage)
+        atlas_name = mgu().get_filename(atlas)
+
+        b0 = mgu().name_tmps(outdir, dti_name, "_b0.nii.gz")
+        b0_aligned = mgu().name_tmps(outdir, dti_name, "_b0_t1.nii.gz")
+        mprage2 = mgu().name_tmps(outdir, mprage_name, "_ss.nii.gz")
+        xfm = mgu().name_tmps(outdir, mprage_name,
+                              "_" + atlas_name + "_xfm.mat")
+
+        # Align DTI volumes to each other
+        self.align_slices(dti, corrected_dti, np.where(gtab.b0s_mask)[0][0])
+
+        # Extracts the B0 volume of the corrected DTI image, reading only it
+        dti_im = nb.load(corrected_dti)
+        b0_im = np.asarray(dti_im.dataobj[..., np.where(gtab.b0s_mask)[0][0]])
+        b0_head = dti_im.get_header().copy()
+        b0_head.set_data_shape(b0_head.get_data_shape()[0:3])
+        b0_out = nb.Nifti1Image(b0_im, affine=dti_im.get_affine(),
+                                header=b0_head)
+        b0_out.update_header()
+        nb.save(b0_out, b0)
+
+        # Applies skull stripping to MPRAGE volume
+        cmd = 'bet ' + mprage + ' ' + mprage2 + ' -B'
+        print("Executing: " + cmd)
+        mgu().execute_cmd(cmd)
+
+        # Aligns the B0 volume to MPRAGE, and MPRAGE to Atlas
+        cmd = "".join(['epi_reg --epi=', b0, ' --t1=', mprage,
+                       ' --t1brain=', mprage2, ' --out=', b0_aligned])
+        print("Executing: " + cmd)
+        mgu().execute_cmd(cmd)
+        self.align(mprage, atlas, xfm)
+
+        # Chains the transforms, in FSL's scaled voxel coordinates, into
+        # one voxel to voxel affine
+        epi_xfm = b0_aligned.split('.nii')[0] + '.mat'
+        affine = flirt_voxel_affine([epi_xfm, xfm], b0_out, nb.load(atlas))
+
+        if clean:
+            cmd = "".join(["rm -f ", b0, " ", b0_aligned.split('.nii')[0],
+                           "* ", xfm, " ", outdir, "/tmp/", mprage_name,
+                           "*"])
+            print("Cleaning temporary registration files...")
+            mgu().execute_cmd(cmd)
+        return affine
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+
+# Copyright 2016 NeuroData (http://neurodata.io)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# transforms.py
+# Created by agent on 2026-10-17.
+# Email: agent@local
+
+from __future__ import print_function
+
+from scipy.ndimage import affine_transform
+import numpy as np
+
+
+def fsl_scaling(img):
+    """
+    Returns the matrix from voxel coordinates to the scaled voxel (mm)
+    coordinates in which FLIRT transforms are expressed. FSL flips the first
+    axis of images whose voxel to world affine has a positive determinant.
+
+    **Positional Arguments:**
+
+            img:
+                - nibabel image
+    """
+    shape = img.get_header().get_data_shape()
+    zooms = img.get_header().get_zooms()[0:3]
+    scale = np.diag(list(zooms) + [1.0])
+    if np.linalg.det(img.get_affine()[0:3, 0:3]) > 0:
+        flip = np.eye(4)
+        flip[0, 0] = -1
+        flip[0, 3] = shape[0] - 1
+        scale = np.dot(scale, flip)
+    return scale
+
+
+def flirt_voxel_affine(mats, src, ref):
+    """
+    Converts a chain of FLIRT transforms into a single affine from voxel
+    coordinates of the source image to voxel coordinates of the reference
+
+    **Positional Arguments:**
+
+            mats:
+                - List of FLIRT matrix files, or 4x4 arrays, in the order
+                  they are applied
+            src:
+                - nibabel image the first transform starts from
+            ref:
+                - nibabel image the last transform ends in
+    """
+    mm = np.eye(4)
+    for mat in mats:
+        mat = np.loadtxt(mat) if isinstance(mat, str) else np.asarray(mat)
+        mm = np.dot(mat, mm)
+    return np.dot(np.linalg.inv(fsl_scaling(ref)),
+                  np.dot(mm, fsl_scaling(src)))
+
+
+def transform_points(points, affine):
+    """
+    Applies a 4x4 affine to an (N, 3) array of points
+
+    **Positional Arguments:**
+
+            points:
+                - (N, 3) array of points
+            affine:
+                - 4x4 affine
+    """
+    affine = np.asarray(affine, dtype=np.float64)
+    return np.dot(points, affine[0:3, 0:3].T) + affine[0:3, 3]
+
+
+def transform_chunks(chunks, affine):
+    """
+    Applies a 4x4 affine to chunks of concatenated streamlines, such as those
+    of ndmg.graph.streamlines.iter_chunks, yielding each transformed chunk
+
+    **Positional Arguments:**
+
+            chunks:
+                - Iterable of (points, offsets) tuples
+            affine:
+                - 4x4 affine
+    """
+    for points, offsets in chunks:
+        yield transform_points(points, affine), offsets
+
+
+def resample_volume(vol, affine, shape, order=1):
+    """
+    Resamples a 3D volume onto a new voxel grid
+
+    **Positional Arguments:**
+
+            vol:
+                - 3D volume
+            affine:
+                - 4x4 affine from voxel coordinates of the new grid to voxel
+                  coordinates of the volume
+            shape:
+                - Shape of the new grid
+
+    **Optional Arguments:**
+
+            order:
+                - Order of the spline interpolation: 0 for nearest neighbour,
+                  1 for trilinear
+    """
+    affine = np.asarray(affine, dtype=np.float64)
+    return affine_transform(np.asarray(vol), affine[0:3, 0:3],
+                            offset=affine[0:3, 3], output_shape=shape,
+                            order=order)
@@ -25,17 +25,20 @@ from subprocess import Popen, PIPE
 import os.path as op
 import nibabel as nb
 import ndmg.graph as mgg
+from ndmg.graph import make_graphs, make_incidence_graphs
 import ndmg.utils as mgu
+from ndmg.utils.fibers import fibers as fiber_handle
 import numpy as np
 
 
-def multigraphs(fibers, labels, outdir):
+def multigraphs(fibers, labels, outdir, nested=False):
     """
-    Creates a brain graph from fiber streamlines
+    Creates a brain graph from fiber streamlines, or from the streamline by
+    voxel incidence matrix saved alongside them (*_incidence.npz)
     """
     startTime = datetime.now()
     fiber_name = mgu().get_filename(fibers)
-    base = fiber_name.split('_fibers', 1)[0]
+    base = fiber_name.split('_fibers', 1)[0].split('_incidence', 1)[0]
     # Create output directories for graphs
     label_name = [mgu().get_filename(x) for x in labels]
     for label in label_name:
@@ -48,17 +51,19 @@ def multigraphs(fibers, labels, outdir):
     print "Graphs of streamlines downsampled to given labels: " +\
           (", ".join([x for x in graphs]))
 
-    # Load fibers
-    print "Loading fibers..."
-    fiber_npz = np.load(fibers)
-    tracks = fiber_npz[fiber_npz.keys()[0]]
-
-    # Generate graphs from streamlines for each parcellation
-    for idx, label in enumerate(label_name):
-        print "Generating graph for " + label + " parcellation..."
-        labels_im = nb.load(labels[idx])
-        g1 = mgg(len(np.unique(labels_im.get_data()))-1, labels[idx])
-        g1.make_graph(tracks)
+    print "Generating graphs for " + ", ".join(label_name) +\
+          " parcellations..."
+    gs = [mgg(len(np.unique(nb.load(lab).get_data()))-1, lab, sparse=True)
+          for lab in labels]
+    if fibers.endswith('_incidence.npz'):
+        # Graphs come from sparse products, without loading streamlines
+        make_incidence_graphs(gs, fibers, nested=nested)
+    else:
+        # Fibers are read lazily, a chunk at a time, while graphs for every
+        # parcellation are generated in one pass
+        print "Loading fibers..."
+        make_graphs(gs, fiber_handle(fibers))
+    for idx, g1 in enumerate(gs):
         g1.summary()
         g1.save_graph(graphs[idx])
 
@@ -70,11 +75,16 @@ def multigraphs(fibers, labels, outdir):
 def main():
     parser = ArgumentParser(description="This is an end-to-end connectome \
                             estimation pipeline from sMRI and DTI images")
-    parser.add_argument("fibers", action="store", help="DTI streamlines")
+    parser.add_argument("fibers", action="store", help="DTI streamlines, or \
+                        their streamline by voxel incidence matrix")
     parser.add_argument("outdir", action="store", help="Path to which \
                         derivatives will be stored")
     parser.add_argument("labels", action="store", nargs="*", help="Nifti \
                         labels of regions of interest in atlas space")
+    parser.add_argument("-n", "--nested", action="store_true", default=False,
+                        help="Whether each label volume is nested within the \
+                        one before it, from fine to coarse. Only used with \
+                        incidence matrices.")
     result = parser.parse_args()
 
     # Create output directory
@@ -84,7 +94,7 @@ def main():
     p = Popen(cmd, stdout=PIPE, stderr=PIPE, shell=True)
     p.communicate()
 
-    multigraphs(result.fibers, result.labels, result.outdir)
+    multigraphs(result.fibers, result.labels, result.outdir, result.nested)
 
 
 if __name__ == "__main__":
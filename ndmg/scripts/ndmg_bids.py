@@ -25,6 +25,7 @@ from os.path import expanduser
 from ndmg.scripts.ndmg_setup import get_files
 from ndmg.utils import bids_s3
 from ndmg.scripts.ndmg_pipeline import ndmg_pipeline
+from ndmg.utils.convert import graph_format
 from ndmg.stats.qa_graphs import *
 from ndmg.stats.qa_graphs_plotting import *
 
@@ -78,7 +79,8 @@ labels = [op.join(atlas_dir, l) for l in labels]
 # *these files can be anywhere up stream of the dwi data, and are inherited.
 
 
-def participant_level(inDir, outDir, subjs, sesh=None, debug=False):
+def participant_level(inDir, outDir, subjs, sesh=None, debug=False,
+                      endpoints=False, radius=0):
     """
     Crawls the given BIDS organized directory for data pertaining to the given
     subject and session, and passes necessary files to ndmg_pipeline for
@@ -155,7 +157,8 @@ def participant_level(inDir, outDir, subjs, sesh=None, debug=False):
         print("Bvec file: " + bvec[i])
 
         ndmg_pipeline(dwi[i], bval[i], bvec[i], anat[i], atlas, atlas_mask,
-                      labels, outDir, clean=(not debug))
+                      labels, outDir, clean=(not debug), endpoints=endpoints,
+                      radius=radius)
 
 
 def group_level(inDir, outDir, dataset=None, atlas=None, minimal=False,
@@ -181,7 +184,8 @@ def group_level(inDir, outDir, dataset=None, atlas=None, minimal=False,
         fs = [op.join(tmp_in, fl)
               for root, dirs, files in os.walk(tmp_in)
               for fl in files
-              if fl.endswith(".graphml") or fl.endswith(".gpickle")]
+              if graph_format(op.join(tmp_in, fl)) in
+              ("graphml", "gpickle", "npz")]
         tmp_out = op.join(outDir, label)
         mgu().execute_cmd("mkdir -p " + tmp_out)
         compute_metrics(fs, tmp_out, label)
@@ -243,6 +247,12 @@ def main():
     parser.add_argument('--debug', action='store_true', help='flag to store '
                         'temp files along the path of processing.',
                         default=False)
+    parser.add_argument('--endpoints', action='store_true', help='flag to '
+                        'only connect the regions containing the endpoints '
+                        'of each streamline.', default=False)
+    parser.add_argument('--radius', action='store', type=float, help='Search '
+                        'radius, in voxels, for endpoints which fall outside '
+                        'of every region.', default=0)
     result = parser.parse_args()
 
     inDir = result.bids_dir
@@ -269,7 +279,8 @@ def main():
             else:
                 bids_s3.get_data(buck, remo, inDir, public=creds)
         modif = 'ndmg_{}'.format(ndmg.version.replace('.', '-'))
-        participant_level(inDir, outDir, subj, sesh, result.debug)
+        participant_level(inDir, outDir, subj, sesh, result.debug,
+                          result.endpoints, result.radius)
     elif level == 'group':
         if buck is not None and remo is not None:
             print("Retrieving data from S3...")
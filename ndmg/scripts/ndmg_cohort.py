@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+
+# Copyright 2016 NeuroData (http://neurodata.io)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# ndmg_cohort.py
+# Created by agent on 2026-10-17.
+# Email: agent@local
+
+from __future__ import print_function
+
+from argparse import ArgumentParser
+from ndmg.utils.cohort import save_cohort
+from ndmg.utils.convert import graph_format
+import os
+
+
+def main():
+    parser = ArgumentParser(description="Packs the graphs of one \
+                            parcellation for a cohort into a single \
+                            memory-mappable file")
+    parser.add_argument("output", action="store", help="Cohort file (.npz)")
+    parser.add_argument("inputs", action="store", nargs="+", help="Graph \
+                        files, or directories which are crawled for them")
+    parser.add_argument("-s", "--sparse", action="store_true", default=None,
+                        help="Store stacked CSR matrices rather than a dense \
+                        array. Defaults to doing so above 1000 nodes.")
+    parser.add_argument("-d", "--dense", action="store_false", dest="sparse",
+                        help="Store a dense (subjects, N, N) array")
+    parser.add_argument("-v", "--verb", action="store_true", help="")
+    result = parser.parse_args()
+
+    fs = []
+    for path in result.inputs:
+        if not os.path.isdir(path):
+            fs.append(path)
+            continue
+        # Fibers, tensors, and other .npz derivatives are not graphs
+        fs += sorted(os.path.join(root, fl)
+                     for root, dirs, files in os.walk(path)
+                     for fl in files
+                     if graph_format(os.path.join(root, fl)) in
+                     ("graphml", "gpickle", "npz"))
+    save_cohort(result.output, fs, result.sparse, result.verb)
+
+
+if __name__ == "__main__":
+    main()
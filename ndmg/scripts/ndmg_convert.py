@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+
+# Copyright 2016 NeuroData (http://neurodata.io)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# ndmg_convert.py
+# Created by agent on 2026-10-17.
+# Email: agent@local
+
+from __future__ import print_function
+
+from argparse import ArgumentParser
+from multiprocessing import cpu_count
+from ndmg.utils.convert import convert_tree, formats
+
+
+def main():
+    parser = ArgumentParser(description="Converts every graph in a \
+                            derivatives tree to another format")
+    parser.add_argument("indir", action="store", help="Directory which is \
+                        crawled for graphs")
+    parser.add_argument("outdir", action="store", help="Directory in which \
+                        the converted graphs are written, mirroring indir")
+    parser.add_argument("fmt", action="store", choices=sorted(formats),
+                        help="Output graph format")
+    parser.add_argument("-i", "--informat", action="store", default=None,
+                        choices=sorted(formats), help="Only converts graphs \
+                        of this format")
+    parser.add_argument("-w", "--workers", action="store", type=int,
+                        default=cpu_count(), help="Number of processes")
+    parser.add_argument("--force", action="store_true", default=False,
+                        help="Converts graphs whose outputs are up to date")
+    parser.add_argument("-v", "--verb", action="store_true", help="")
+    result = parser.parse_args()
+
+    convert_tree(result.indir, result.outdir, result.fmt, result.workers,
+                 result.force, result.informat, result.verb)
+
+
+if __name__ == "__main__":
+    main()
@@ -31,6 +31,9 @@ import ndmg.utils as mgu
 import ndmg.register as mgr
 import ndmg.track as mgt
 import ndmg.graph as mgg
+from ndmg.graph import make_graphs, save_incidence, voxel_graph
+from ndmg.track.tensors import save_tensors
+from ndmg.register.transforms import resample_volume
 import ndmg.preproc as mgp
 import numpy as np
 import nibabel as nb
@@ -40,7 +43,12 @@ os.environ["MPLCONFIGDIR"] = "/tmp/"
 
 
 def ndmg_pipeline(dti, bvals, bvecs, mprage, atlas, mask, labels, outdir,
-                  clean=False, fmt='gpickle'):
+                  clean=False, fmt='gpickle', stats=False, incidence=False,
+                  endpoints=False, radius=0, voxelwise=None, workers=1,
+                  seeding='voxel', nseeds=1, stride=1, seed_fa=None,
+                  random_state=0, max_streamlines=None, time_budget=None,
+                  cache=None, cache_size=8, tolerance=None, step=None,
+                  native=False):
     """
     Creates a brain graph from MRI data
     """
@@ -65,18 +73,40 @@ def ndmg_pipeline(dti, bvals, bvecs, mprage, atlas, mask, labels, outdir,
 
     # Create derivative output file names
     aligned_dti = "".join([outdir, "/reg_dti/", dti_name, "_aligned.nii.gz"])
+    if native:
+        # Tensors and fibers are computed in native space, and only the
+        # streamlines are mapped to the atlas
+        aligned_dti = "".join([outdir, "/reg_dti/", dti_name,
+                               "_native.nii.gz"])
+        reg_b0 = "".join([outdir, "/reg_dti/", dti_name, "_b0_aligned.nii.gz"])
+        xfm = "".join([outdir, "/reg_dti/", dti_name, "_native2atlas.txt"])
+        native_mask = "".join([outdir, "/tmp/", dti_name, "_mask.nii.gz"])
     tensors = "".join([outdir, "/tensors/", dti_name, "_tensors.npz"])
     fibers = "".join([outdir, "/fibers/", dti_name, "_fibers.npz"])
+    inc = "".join([outdir, "/fibers/", dti_name, "_incidence.npz"])
     print("This pipeline will produce the following derivatives...")
-    print("DTI volume registered to atlas: " + aligned_dti)
-    print("Diffusion tensors in atlas space: " + tensors)
+    if native:
+        print("DTI volume in native space: " + aligned_dti)
+        print("B0 volume registered to atlas: " + reg_b0)
+        print("Voxel transform from native to atlas space: " + xfm)
+        print("Diffusion tensors in native space: " + tensors)
+    else:
+        print("DTI volume registered to atlas: " + aligned_dti)
+        print("Diffusion tensors in atlas space: " + tensors)
     print("Fiber streamlines in atlas space: " + fibers)
+    if incidence:
+        print("Streamline by voxel incidence in atlas space: " + inc)
 
     # Again, graphs are different
     graphs = ["".join([outdir, "/graphs/", x, '/', dti_name, "_", x, '.', fmt])
               for x in label_name]
     print("Graphs of streamlines downsampled to given labels: " +
           ", ".join([x for x in graphs]))
+    # Kept out of graphs/, where every directory is taken as a parcellation
+    vgraph = "".join([outdir, "/voxelwise/", dti_name, "_voxelwise.npz"])
+    if voxelwise is not None:
+        mgu().execute_cmd("mkdir -p " + outdir + "/voxelwise")
+        print("Voxelwise graph of streamlines: " + vgraph)
 
     # Creates gradient table from bvalues and bvectors
     print("Generating gradient table...")
@@ -87,13 +117,45 @@ def ndmg_pipeline(dti, bvals, bvecs, mprage, atlas, mask, labels, outdir,
 
     # Align DTI volumes to Atlas
     print("Aligning volumes...")
-    mgr().dti2atlas(dti1, gtab, mprage, atlas, aligned_dti, outdir, clean)
     b0loc = np.where(gtab.b0s_mask)[0][0]
-    reg_dti_pngs(aligned_dti, b0loc, atlas, outdir+"/qa/reg_dti/")
+    atlas_shape = nb.load(mask).get_data().shape
+    if native:
+        # Only the transform is computed; the mask is brought to the DTI
+        # image, and the B0 volume to the atlas for QA
+        transform = mgr().dti2atlas_native(dti1, gtab, mprage, atlas,
+                                           aligned_dti, outdir, clean)
+        np.savetxt(xfm, transform)
+        dti_img = nb.load(aligned_dti)
+        track_mask = native_mask
+        nmask = resample_volume(nb.load(mask).get_data(), transform,
+                                dti_img.shape[0:3], order=0)
+        nb.save(nb.Nifti1Image((nmask > 0).astype(np.uint8),
+                               dti_img.get_affine()), native_mask)
+        b0 = resample_volume(dti_img.dataobj[..., b0loc],
+                             np.linalg.inv(transform), atlas_shape)
+        nb.save(nb.Nifti1Image(b0[..., None], nb.load(mask).get_affine()),
+                reg_b0)
+        reg_dti_pngs(reg_b0, 0, atlas, outdir+"/qa/reg_dti/")
+    else:
+        mgr().dti2atlas(dti1, gtab, mprage, atlas, aligned_dti, outdir,
+                        clean)
+        transform = None
+        track_mask = mask
+        reg_dti_pngs(aligned_dti, b0loc, atlas, outdir+"/qa/reg_dti/")
 
     print("Beginning tractography...")
-    # Compute tensors and track fiber streamlines
-    tens, tracks = mgt().eudx_basic(aligned_dti, mask, gtab, stop_val=0.2)
+    # Compute tensors and track fiber streamlines, streaming them to disk
+    tens, tracks = mgt().eudx_basic(aligned_dti, track_mask, gtab,
+                                    stop_val=0.2,
+                                    workers=workers, fibers=fibers,
+                                    seeding=seeding, nseeds=nseeds,
+                                    stride=stride, seed_fa=seed_fa,
+                                    random_state=random_state,
+                                    max_streamlines=max_streamlines,
+                                    time_budget=time_budget, cache=cache,
+                                    cache_size=int(cache_size * 2**30),
+                                    tolerance=tolerance, step=step,
+                                    transform=transform)
     tensor2fa(tens, tensors, aligned_dti, outdir+"/tensors/",
               outdir+"/qa/tensors/")
 
@@ -104,19 +166,39 @@ def ndmg_pipeline(dti, bvals, bvecs, mprage, atlas, mask, labels, outdir,
         except:
             print("Fiber QA failed - VTK for Python not configured properly.")
 
-    # And save them to disk
-    np.savez(tensors, tens)
-    np.savez(fibers, tracks)
+    # Compressed or transformed streamlines may step over voxels, so every
+    # voxel they pass through is found exactly rather than by sampling their
+    # points
+    exact = tolerance is not None or step is not None or native
 
-    # Generate graphs from streamlines for each parcellation
-    for idx, label in enumerate(label_name):
-        print("Generating graph for " + label + " parcellation...")
+    # And save them to disk
+    save_tensors(tensors, tens, nb.load(track_mask).get_data(),
+                 nb.load(aligned_dti).get_affine())
+    if incidence:
+        save_incidence(inc, tracks, nb.load(mask).get_data().shape,
+                       exact=exact)
 
-        labels_im = nb.load(labels[idx])
-        g1 = mgg(len(np.unique(labels_im.get_data()))-1, labels[idx])
-        g1.make_graph(tracks)
+    # Generate graphs from streamlines for every parcellation in one pass
+    print("Generating graphs for " + ", ".join(label_name) +
+          " parcellations...")
+    gs = [mgg(len(np.unique(nb.load(lab).get_data()))-1, lab, sparse=True)
+          for lab in labels]
+    if voxelwise is not None:
+        gs.append(voxel_graph(mask, voxelwise))
+    scalars = None
+    if stats:
+        fa = np.nan_to_num(tens.fa)
+        if native:
+            fa = resample_volume(fa, np.linalg.inv(transform), atlas_shape)
+        scalars = {'fa': fa}
+    make_graphs(gs, tracks, workers=workers, lengths=stats, scalars=scalars,
+                endpoints=endpoints, radius=radius, exact=exact)
+    for idx, g1 in enumerate(gs[0:len(graphs)]):
         g1.summary()
         g1.save_graph(graphs[idx], fmt=fmt)
+    if voxelwise is not None:
+        gs[-1].summary()
+        gs[-1].save_graph(vgraph, fmt='npz')
 
     print("Execution took: " + str(datetime.now() - startTime))
 
@@ -149,6 +231,66 @@ def main():
                         help="Whether or not to delete intemediates")
     parser.add_argument("-f", "--fmt", action="store", default='gpickle',
                         help="Determines graph output format")
+    parser.add_argument("-s", "--stats", action="store_true", default=False,
+                        help="Whether to store the streamline length and FA \
+                        of each edge")
+    parser.add_argument("-i", "--incidence", action="store_true",
+                        default=False, help="Whether to save the streamline \
+                        by voxel incidence matrix, from which graphs for new \
+                        labels can be built without the streamlines")
+    parser.add_argument("-e", "--endpoints", action="store_true",
+                        default=False, help="Whether to only connect the \
+                        regions containing the endpoints of each streamline")
+    parser.add_argument("-r", "--radius", action="store", type=float,
+                        default=0, help="Search radius, in voxels, for \
+                        endpoints which fall outside of every region")
+    parser.add_argument("--voxelwise", action="store", type=int, default=None,
+                        help="Also builds a graph of every voxel in the mask, \
+                        keyed by Morton code, with nodes merged into cubes of \
+                        2^VOXELWISE voxels on a side. Saved in npz format.")
+    parser.add_argument("-w", "--workers", action="store", type=int,
+                        default=1, help="Number of processes used to fit \
+                        tensors and build graphs")
+    parser.add_argument("--seeding", action="store", default='voxel',
+                        choices=['voxel', 'count', 'density', 'grid'],
+                        help="Seeding strategy: one seed per mask voxel, a \
+                        fixed total count of random seeds, a number of \
+                        random seeds per voxel, or a strided grid")
+    parser.add_argument("--nseeds", action="store", type=int, default=1,
+                        help="Total number of seeds (count), or seeds per \
+                        voxel (density)")
+    parser.add_argument("--stride", action="store", type=int, default=1,
+                        help="Spacing, in voxels, of the seed grid (grid)")
+    parser.add_argument("--seed-fa", action="store", type=float,
+                        default=None, help="Only seeds voxels with an FA \
+                        above this threshold")
+    parser.add_argument("--random-state", action="store", type=int,
+                        default=0, help="Seed of the random number \
+                        generator used to place and order seeds")
+    parser.add_argument("--max-streamlines", action="store", type=int,
+                        default=None, help="Stops tracking after this many \
+                        streamlines, tracking seeds in a random order")
+    parser.add_argument("--time-budget", action="store", type=float,
+                        default=None, help="Stops tracking after this many \
+                        seconds, tracking seeds in a random order")
+    parser.add_argument("--tensor-cache", action="store", default=None,
+                        help="Directory in which tensor fits are cached, so \
+                        that rerunning tractography on the same data skips \
+                        the fit")
+    parser.add_argument("--cache-size", action="store", type=float,
+                        default=8, help="Size, in GB, above which the least \
+                        recently used tensor fits are evicted")
+    parser.add_argument("--tolerance", action="store", type=float,
+                        default=None, help="Simplifies streamlines, removing \
+                        points which are within this many voxels of them")
+    parser.add_argument("--step", action="store", type=float, default=None,
+                        help="Resamples streamlines to points no more than \
+                        this many voxels apart")
+    parser.add_argument("--native", action="store_true", default=False,
+                        help="Fits tensors and tracks fibers in the native \
+                        space of the DTI image, then maps the streamlines to \
+                        the atlas, rather than resampling the DTI volumes to \
+                        the atlas")
     result = parser.parse_args()
 
     # Create output directory
@@ -160,7 +302,13 @@ def main():
 
     ndmg_pipeline(result.dti, result.bval, result.bvec, result.mprage,
                   result.atlas, result.mask, result.labels, result.outdir,
-                  result.clean, result.fmt)
+                  result.clean, result.fmt, result.stats, result.incidence,
+                  result.endpoints, result.radius, result.voxelwise,
+                  result.workers, result.seeding, result.nseeds,
+                  result.stride, result.seed_fa, result.random_state,
+                  result.max_streamlines, result.time_budget,
+                  result.tensor_cache, result.cache_size, result.tolerance,
+                  result.step, result.native)
 
 
 if __name__ == "__main__":
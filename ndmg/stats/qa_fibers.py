@@ -28,22 +28,25 @@ import subprocess
 
 from dipy.viz import window, actor
 from argparse import ArgumentParser
+from ndmg.utils.fibers import fibers
 
 try:
     import vtk
 except ImportError:
     pass
 
-def visualize_fibs(fibs, fibfile, atlasfile, outdir, opacity, num_samples):
+def visualize_fibs(fibs, fibfile, atlasfile, outdir, opacity,
+                   num_samples=10000):
     """
     Takes fiber streamlines and visualizes them using DiPy
     Required Arguments:
+        - fibs: Fiber streamlines, or None to read them from fibfile
         - fibfile: Path to fiber file
         - atlasfile: Path to atlas file
         - outdir: Path to output directory
         - opacity: Opacity of overlayed brain
-        - num_samples: number of fibers to randomly sample from fibfile
     Optional Arguments:
+        - num_samples: number of fibers to randomly sample from fibfile
     """
     try:
         import vtk
@@ -52,7 +55,9 @@ def visualize_fibs(fibs, fibfile, atlasfile, outdir, opacity, num_samples):
         print("!! VTK not found; skipping fiber QA.")
         return
 
-    # loading the fibers
+    # loading the fibers lazily, so that only those drawn are read
+    if fibs is None:
+        fibs = fibers(fibfile)
     fibs = threshold_fibers(fibs)
 
     # make sure if fiber streamlines
@@ -70,7 +75,7 @@ def visualize_fibs(fibs, fibfile, atlasfile, outdir, opacity, num_samples):
     renderer.SetBackground(1.0, 1.0, 1.0)
 
     # Add streamlines as a DiPy viz object
-    stream_actor = actor.line(fibs)
+    stream_actor = actor.line([np.asarray(f) for f in resampled_fibs])
 
     # Set camera orientation properties
     # TODO: allow this as an argument
@@ -90,15 +95,19 @@ def visualize_fibs(fibs, fibfile, atlasfile, outdir, opacity, num_samples):
 
 def threshold_fibers(fibs):
     '''
-    fibs: fibers as 2D array (N,3)
+    fibs: fibers as 2D array (N,3), or a fibers handle
     '''
-    fib_lengths = [len(f) for f in fibs]
+    if hasattr(fibs, 'lengths'):
+        fib_lengths = fibs.lengths()
+    else:
+        fib_lengths = np.array([len(f) for f in fibs])
     if (len(fib_lengths) == 0):
-        return fib_lengths
+        return []
     # calculate median of  fiber lengths
     med = np.median(fib_lengths)
-    # get only fibers above the median length
-    long_fibs = [f for f in fibs if len(f) > med]
+    # get only fibers above the median length; fibers of a handle are views
+    # of its memory-mapped points, so none are read here
+    long_fibs = [fibs[i] for i in np.flatnonzero(fib_lengths > med)]
     return long_fibs
 
 
@@ -24,6 +24,7 @@ from collections import OrderedDict
 from subprocess import Popen
 from scipy.stats import gaussian_kde
 from ndmg.utils import loadGraphs
+from ndmg.utils.convert import graph_format
 
 import numpy as np
 import nibabel as nb
@@ -51,7 +52,7 @@ def compute_metrics(fs, outdir, atlas, verb=False):
             - Toggles verbose output statements
     """
 
-    graphs = loadGraphs(fs, verb=verb)
+    graphs = loadGraphs(fs, verb=verb, networkx=True)
     nodes = nx.number_of_nodes(graphs.values()[0])
 
     #  Number of non-zero edges (i.e. binary edge count)
@@ -250,7 +251,7 @@ def main():
     fs = [indir + "/" + fl
           for root, dirs, files in os.walk(indir)
           for fl in files
-          if fl.endswith(".graphml") or fl.endswith(".gpickle")]
+          if graph_format(indir + "/" + fl) in ("graphml", "gpickle", "npz")]
 
     p = Popen("mkdir -p " + result.outdir, shell=True)
     #  The fun begins and now we load our graphs and process them.
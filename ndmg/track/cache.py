@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+
+# Copyright 2016 NeuroData (http://neurodata.io)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# cache.py
+# Created by agent on 2026-10-17.
+# Email: agent@local
+
+from __future__ import print_function
+
+from tempfile import mkstemp
+import numpy as np
+import os.path as op
+import hashlib
+import os
+
+# Changing how fits are computed or stored must change this, so that stale
+# entries are never used
+cache_version = 'ndmg-tensors-1'
+
+
+def fit_key(dti_file, mask_file, gtab, sphere, block=2**20):
+    """
+    Returns the key of a tensor fit: a hash of the contents of the DTI and
+    mask files, the gradient table, and the sphere directions are quantized
+    to
+
+    **Positional Arguments:**
+
+            dti_file:
+                - File (registered) to which tensors are fit
+            mask_file:
+                - Brain mask within which tensors are fit
+            gtab:
+                - dipy formatted bval/bvec Structure
+            sphere:
+                - Name of the sphere directions are quantized to
+
+    **Optional Arguments:**
+
+            block:
+                - Number of bytes of each file read at a time
+    """
+    h = hashlib.sha1(cache_version.encode('ascii'))
+    for fname in (dti_file, mask_file):
+        with open(fname, 'rb') as f:
+            for chunk in iter(lambda: f.read(block), b''):
+                h.update(chunk)
+    h.update(np.ascontiguousarray(gtab.bvals, dtype=np.float64).tobytes())
+    h.update(np.ascontiguousarray(gtab.bvecs, dtype=np.float64).tobytes())
+    h.update(sphere.encode('ascii'))
+    return h.hexdigest()
+
+
+class tensor_cache(object):
+    def __init__(self, directory, max_size=2**33):
+        """
+        Directory of tensor fits, keyed by fit_key, so that tracking can be
+        rerun with new parameters without refitting tensors. Once the
+        directory holds more than max_size bytes, the least recently used
+        fits are removed.
+
+        **Positional Arguments:**
+
+                directory:
+                    - Directory in which fits are stored
+
+        **Optional Arguments:**
+
+                max_size:
+                    - Number of bytes the cache may hold
+        """
+        self.directory = directory
+        self.max_size = max_size
+        if not op.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                pass
+        pass
+
+    def path(self, key):
+        """
+        Returns the file in which a fit is stored
+        """
+        return op.join(self.directory, key + '.npz')
+
+    def get(self, key):
+        """
+        Returns the arrays stored for a key, or None if there are none. Using
+        a fit marks it as recently used.
+
+        **Positional Arguments:**
+
+                key:
+                    - Key returned by fit_key
+        """
+        fname = self.path(key)
+        try:
+            with np.load(fname) as npz:
+                arrays = dict((k, npz[k]) for k in npz.files)
+            os.utime(fname, None)
+        except (IOError, OSError, ValueError):
+            return None
+        return arrays
+
+    def put(self, key, **arrays):
+        """
+        Stores arrays under a key, then evicts the least recently used fits
+        if the cache is too large. Fits are written to a temporary file and
+        renamed into place, so that readers never see a partial fit.
+
+        **Positional Arguments:**
+
+                key:
+                    - Key returned by fit_key
+                arrays:
+                    - Named arrays to store
+        """
+        fd, tmp = mkstemp(prefix='.', suffix='.npz', dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **arrays)
+            os.rename(tmp, self.path(key))
+        except BaseException:
+            if op.exists(tmp):
+                os.remove(tmp)
+            raise
+        self.evict(keep=key)
+        pass
+
+    def evict(self, keep=None):
+        """
+        Removes the least recently used fits until the cache holds no more
+        than max_size bytes
+
+        **Optional Arguments:**
+
+                keep:
+                    - Key which is never removed
+        """
+        entries = []
+        for fl in os.listdir(self.directory):
+            if (fl.startswith('.') or not fl.endswith('.npz') or
+                    fl == str(keep) + '.npz'):
+                continue
+            fname = op.join(self.directory, fl)
+            try:
+                st = os.stat(fname)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, fname))
+        total = sum(e[1] for e in entries)
+        if keep is not None and op.exists(self.path(keep)):
+            total += op.getsize(self.path(keep))
+        for mtime, size, fname in sorted(entries):
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(fname)
+                print("Evicted tensor fit: " + fname)
+            except OSError:
+                pass
+            total -= size
+        pass
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+
+# Copyright 2016 NeuroData (http://neurodata.io)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# compress.py
+# Created by agent on 2026-10-17.
+# Email: agent@local
+
+from __future__ import print_function
+
+import numpy as np
+
+
+def segment_distance(p, a, b):
+    """
+    Returns the distance of each point from the segment joining the
+    corresponding points of a and b
+
+    **Positional Arguments:**
+
+            p, a, b:
+                - (n, 3) arrays of points
+    """
+    ab = b - a
+    norm = np.einsum('ij,ij->i', ab, ab)
+    t = np.einsum('ij,ij->i', p - a, ab) / np.where(norm > 0, norm, 1)
+    t = np.clip(t, 0, 1)
+    return np.linalg.norm(p - (a + t[:, None] * ab), axis=1)
+
+
+def simplify(points, offsets, tolerance):
+    """
+    Removes points from streamlines with the Douglas-Peucker algorithm, so
+    that no removed point is further than a tolerance from the simplified
+    streamline. The endpoints of every streamline are kept. Every streamline
+    is simplified at once: each pass splits, at its furthest point, every
+    segment which is not yet within the tolerance.
+
+    **Positional Arguments:**
+
+            points:
+                - (N, 3) array of concatenated streamline points
+            offsets:
+                - Offsets of each streamline into the points
+            tolerance:
+                - Maximum distance, in voxels, of a removed point from the
+                  simplified streamline
+    """
+    points = np.asarray(points)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    keep = np.zeros(len(points), dtype=bool)
+    starts, stops = offsets[:-1], offsets[1:]
+    full = stops > starts
+    keep[starts[full]] = True
+    keep[stops[full] - 1] = True
+
+    active = np.flatnonzero(~keep)
+    while len(active):
+        # Kept points on either side of each point being considered
+        kept = np.flatnonzero(keep)
+        seg = np.searchsorted(kept, active) - 1
+        a, b = kept[seg], kept[seg + 1]
+        d = segment_distance(points[active], points[a], points[b])
+
+        # Furthest point of each segment, as active points are in order
+        first = np.flatnonzero(np.r_[True, seg[1:] != seg[:-1]])
+        dmax = np.maximum.reduceat(d, first)
+        runs = np.diff(np.r_[first, len(active)])
+        over = np.repeat(dmax > tolerance, runs)
+        split = over & (d == np.repeat(dmax, runs))
+        # Only the first furthest point of a segment is kept
+        split &= np.r_[True, (seg[1:] != seg[:-1]) | ~split[:-1]]
+        keep[active[split]] = True
+        active = active[over & ~split]
+
+    # Each offset moves back by the number of points removed before it
+    kept = np.r_[0, np.cumsum(keep, dtype=np.int64)]
+    return points[keep], kept[offsets]
+
+
+def resample(points, offsets, step):
+    """
+    Resamples streamlines to points evenly spaced along their length, no
+    further apart than a step. The endpoints of every streamline are kept.
+
+    **Positional Arguments:**
+
+            points:
+                - (N, 3) array of concatenated streamline points
+            offsets:
+                - Offsets of each streamline into the points
+            step:
+                - Maximum distance, in voxels, between resampled points
+    """
+    points = np.asarray(points, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    starts, stops = offsets[:-1], offsets[1:]
+    if len(points) == 0:
+        return points, offsets
+
+    # Arc length along every streamline, with a gap of one between them so
+    # that positions along different streamlines never coincide
+    seglen = np.r_[0, np.linalg.norm(np.diff(points, axis=0), axis=1)]
+    full = stops > starts
+    seglen[starts[full]] = 1
+    arc = np.cumsum(seglen)
+    length = np.zeros(len(starts))
+    length[full] = arc[stops[full] - 1] - arc[starts[full]]
+
+    counts = np.where(stops - starts > 1,
+                      np.maximum(2, np.ceil(length / step) + 1),
+                      stops - starts).astype(np.int64)
+    new = np.zeros(len(offsets), dtype=np.int64)
+    np.cumsum(counts, out=new[1:])
+
+    # Position of every new point along the arc of its streamline
+    line = np.repeat(np.arange(len(counts)), counts)
+    k = np.arange(new[-1]) - new[line]
+    frac = k / np.maximum(counts[line] - 1, 1).astype(np.float64)
+    target = arc[starts[line]] + frac * length[line]
+
+    # Segment of the original streamline on which each new point falls
+    j = np.searchsorted(arc, target, side='right') - 1
+    j = np.clip(j, starts[line], np.maximum(stops[line] - 2, starts[line]))
+    nxt = np.minimum(j + 1, stops[line] - 1)
+    denom = arc[nxt] - arc[j]
+    t = np.where(denom > 0, (target - arc[j]) / np.where(denom > 0, denom, 1),
+                 0)
+    t = np.clip(t, 0, 1)
+    out = points[j] + t[:, None] * (points[nxt] - points[j])
+    return out, new
+
+
+def compress(points, offsets, tolerance=None, step=None):
+    """
+    Compresses concatenated streamlines by resampling them to a step and
+    then simplifying them to a tolerance. Either may be omitted.
+
+    **Positional Arguments:**
+
+            points:
+                - (N, 3) array of concatenated streamline points
+            offsets:
+                - Offsets of each streamline into the points
+
+    **Optional Arguments:**
+
+            tolerance:
+                - Maximum distance, in voxels, of a removed point from the
+                  simplified streamline
+            step:
+                - Maximum distance, in voxels, between resampled points
+    """
+    if step is not None:
+        points, offsets = resample(points, offsets, step)
+    if tolerance is not None:
+        points, offsets = simplify(points, offsets, tolerance)
+    return points, offsets
+
+
+def compress_chunks(chunks, tolerance=None, step=None, status=None):
+    """
+    Compresses chunks of concatenated streamlines, such as those of
+    ndmg.graph.streamlines.iter_chunks, yielding each compressed chunk. The
+    number of points before and after compression is recorded in the status
+    dictionary.
+
+    **Positional Arguments:**
+
+            chunks:
+                - Iterable of (points, offsets) tuples
+
+    **Optional Arguments:**
+
+            tolerance:
+                - Maximum distance, in voxels, of a removed point from the
+                  simplified streamline
+            step:
+                - Maximum distance, in voxels, between resampled points
+            status:
+                - Dictionary updated with the number of points
+    """
+    status = status if status is not None else dict()
+    status.update(raw_points=0, compressed_points=0)
+    for points, offsets in chunks:
+        status['raw_points'] += int(offsets[-1] - offsets[0])
+        points, offsets = compress(points, offsets, tolerance, step)
+        status['compressed_points'] += int(offsets[-1] - offsets[0])
+        yield points, offsets
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+
+# Copyright 2016 NeuroData (http://neurodata.io)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# parallel.py
+# Created by agent on 2026-10-17.
+# Email: agent@local
+
+from __future__ import print_function
+
+from dipy.tracking.eudx import EuDX
+from ndmg.utils.pool import share_volume, view_volume, bounded_imap
+import time
+
+# Volumes and tracking options as seen by each worker, set by init_worker
+shared_fa = None
+shared_ind = None
+shared_options = dict()
+
+
+def init_worker(fa, ind, options):
+    """
+    Views the shared FA and quantized direction volumes as arrays within a
+    worker process, and records the remaining EuDX options
+    """
+    global shared_fa, shared_ind, shared_options
+    shared_fa = view_volume(fa)
+    shared_ind = view_volume(ind)
+    shared_options = options
+
+
+def track_seeds(seeds):
+    """
+    Tracks from one shard of seeds with the shared volumes
+
+    **Positional Arguments:**
+
+            seeds:
+                - (n, 3) array of seed voxels
+    """
+    eu = EuDX(a=shared_fa, ind=shared_ind, seeds=seeds, **shared_options)
+    return [e for e in eu]
+
+
+def eudx_shards(fa, ind, seeds, odf_vertices, a_low, workers=1,
+                shard_size=10000, backlog=2):
+    """
+    Runs EuDX from shards of the seeds, yielding the number of seeds in each
+    shard along with its tracks, in seed order. Shards are tracked across a
+    pool of processes if more than one worker is used, and otherwise in this
+    process. Closing the generator early stops any outstanding shards.
+
+    **Positional Arguments:**
+
+            fa:
+                - Fractional anisotropy volume
+            ind:
+                - Quantized principal direction of each voxel
+            seeds:
+                - (n, 3) array of seed voxels
+            odf_vertices:
+                - Sphere vertices which ind indexes into
+            a_low:
+                - FA below which tracking stops
+
+    **Optional Arguments:**
+
+            workers:
+                - Number of processes to use
+            shard_size:
+                - Number of seeds tracked per task
+            backlog:
+                - Number of shards queued per process
+    """
+    options = dict(odf_vertices=odf_vertices, a_low=a_low)
+    starts = range(0, len(seeds), shard_size)
+    if workers <= 1:
+        for start in starts:
+            shard = seeds[start:start + shard_size]
+            eu = EuDX(a=fa, ind=ind, seeds=shard, **options)
+            yield len(shard), [e for e in eu]
+        return
+
+    shards = (seeds[start:start + shard_size] for start in starts)
+    tracks = bounded_imap(track_seeds, shards, workers, backlog, init_worker,
+                          (share_volume(fa), share_volume(ind), options))
+    for shard, start in zip(tracks, starts):
+        yield min(shard_size, len(seeds) - start), shard
+
+
+def limit_tracks(shards, max_streamlines=None, time_budget=None,
+                 status=None):
+    """
+    Yields the tracks of each shard from eudx_shards until a streamline
+    count or time budget is reached, at which point tracking is stopped.
+    How far tracking got is recorded in the status dictionary: the number
+    of seeds tracked, the number of streamlines kept, the elapsed time, and
+    why tracking stopped. If tracking stops partway through the tracks of a
+    shard, its seeds are counted in proportion to the tracks kept.
+
+    **Positional Arguments:**
+
+            shards:
+                - Iterator of (number of seeds, tracks) for each shard
+
+    **Optional Arguments:**
+
+            max_streamlines:
+                - Number of streamlines after which tracking stops
+            time_budget:
+                - Number of seconds after which no further shards are tracked
+            status:
+                - Dictionary updated with the progress of tracking
+    """
+    status = status if status is not None else dict()
+    status.update(seeds_tracked=0, streamlines=0, stopped='complete')
+    start = time.time()
+    try:
+        for n, tracks in shards:
+            keep = len(tracks)
+            if max_streamlines is not None:
+                keep = min(keep, max_streamlines - status['streamlines'])
+            for track in tracks[:keep]:
+                yield track
+            status['streamlines'] += keep
+            status['seeds_tracked'] += (n if keep == len(tracks) else
+                                        int(round(n * keep /
+                                                  float(len(tracks)))))
+            if keep < len(tracks) or (max_streamlines is not None and
+                                      status['streamlines'] >=
+                                      max_streamlines):
+                status['stopped'] = 'max_streamlines'
+                break
+            if (time_budget is not None and
+                    time.time() - start >= time_budget):
+                status['stopped'] = 'time_budget'
+                break
+    finally:
+        status['elapsed'] = time.time() - start
+        if hasattr(shards, 'close'):
+            shards.close()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+# Copyright 2016 NeuroData (http://neurodata.io)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# seeds.py
+# Created by agent on 2026-10-17.
+# Email: agent@local
+
+from __future__ import print_function
+
+import numpy as np
+
+# Seeding strategies understood by make_seeds
+strategies = ('voxel', 'count', 'density', 'grid')
+
+
+def seed_region(mask, fa=None, fa_thresh=None):
+    """
+    Returns the voxels in which seeds may be placed: those within the mask
+    and, if a threshold is given, with an FA above it
+
+    **Positional Arguments:**
+
+            mask:
+                - Brain mask
+
+    **Optional Arguments:**
+
+            fa:
+                - Fractional anisotropy volume
+            fa_thresh:
+                - FA at or below which voxels are not seeded
+    """
+    region = np.asarray(mask) > 0
+    if fa_thresh is not None:
+        if fa is None:
+            raise ValueError('An FA volume is needed for an FA threshold')
+        region &= np.nan_to_num(fa) > fa_thresh
+    return region
+
+
+def make_seeds(mask, strategy='voxel', nseeds=1, stride=1, fa=None,
+               fa_thresh=None, random_state=0):
+    """
+    Places tractography seeds within a mask, in voxel coordinates. Random
+    seeds are drawn uniformly within their voxel from a generator with a
+    fixed seed, so that the same seeds are placed on every run.
+
+    **Positional Arguments:**
+
+            mask:
+                - Brain mask
+
+    **Optional Arguments:**
+
+            strategy:
+                - How seeds are placed:
+                    voxel: one seed at the centre of every voxel
+                    count: nseeds seeds in total, in random voxels
+                    density: nseeds random seeds in every voxel
+                    grid: one seed at the centre of every stride-th voxel
+                      along each axis
+            nseeds:
+                - Total number of seeds (count), or seeds per voxel (density)
+            stride:
+                - Spacing, in voxels, of the grid
+            fa:
+                - Fractional anisotropy volume, needed for fa_thresh
+            fa_thresh:
+                - FA at or below which voxels are not seeded
+            random_state:
+                - Seed of the random number generator
+    """
+    if strategy not in strategies:
+        raise ValueError('strategy must be one of ' + ', '.join(strategies))
+    region = seed_region(mask, fa, fa_thresh)
+    if strategy == 'voxel':
+        return np.argwhere(region)
+    if strategy == 'grid':
+        start = (stride - 1) // 2
+        sub = region[start::stride, start::stride, start::stride]
+        return np.argwhere(sub) * stride + start
+
+    voxels = np.argwhere(region)
+    rng = np.random.RandomState(random_state)
+    if strategy == 'count':
+        if len(voxels) == 0:
+            return np.zeros((0, 3))
+        voxels = voxels[rng.randint(len(voxels), size=int(nseeds))]
+    else:
+        voxels = np.repeat(voxels, int(nseeds), axis=0)
+    return voxels + rng.uniform(-0.5, 0.5, size=voxels.shape)
@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+
+# Copyright 2016 NeuroData (http://neurodata.io)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# tensors.py
+# Created by agent on 2026-10-17.
+# Email: agent@local
+
+from __future__ import print_function
+
+from dipy.reconst.dti import TensorModel, TensorFit, fractional_anisotropy
+from dipy.reconst.dti import (lower_triangular, from_lower_triangular,
+                              decompose_tensor)
+from ndmg.utils.pool import bounded_imap
+from ndmg.utils.masked import masked_volume
+from ndmg.utils.npz import load_npz
+import numpy as np
+
+
+def chunk_rows(nvols, memory):
+    """
+    Chooses how many voxels are fit at once, so that a chunk of the data and
+    its intermediate arrays fit within a memory budget. At least one voxel
+    is always used.
+
+    **Positional Arguments:**
+
+            nvols:
+                - Number of diffusion volumes
+            memory:
+                - Approximate number of bytes used per chunk
+    """
+    # The chunk, its float64 copy and log, and the 12 tensor parameters
+    per_voxel = 8 * (3 * nvols + 24)
+    return max(1, int(memory // per_voxel))
+
+
+def fit_chunk(args):
+    """
+    Fits tensors to a chunk of voxels, returning the tensor parameters
+    (eigenvalues followed by eigenvectors) of each
+
+    **Positional Arguments:**
+
+            args:
+                - Tuple of the gradient table and (n_voxels, n_volumes) data
+    """
+    gtab, data = args
+    return TensorModel(gtab).fit(data).model_params
+
+
+def fit_masked(data, mask, gtab, workers=1, memory=2**30, backlog=2):
+    """
+    Fits tensors to only the voxels within a mask, in chunks of voxels,
+    across a pool of processes. Returns a tensor fit with one row per masked
+    voxel, which can be placed back into a volume with mask.scatter.
+
+    **Positional Arguments:**
+
+            data:
+                - 4D diffusion volume, or a nibabel image's dataobj, of which
+                  only the bounding box of the mask is read
+            mask:
+                - masked_volume of the brain mask
+            gtab:
+                - dipy formatted bval/bvec Structure
+
+    **Optional Arguments:**
+
+            workers:
+                - Number of processes to use
+            memory:
+                - Approximate number of bytes used by each process for its
+                  chunk of the data
+            backlog:
+                - Number of chunks queued per process
+    """
+    model = TensorModel(gtab)
+    rows = mask.gather(data)
+    params = np.zeros((len(mask), 12))
+    step = chunk_rows(data.shape[3], memory)
+    chunks = [(r, min(r + step, len(mask))) for r in range(0, len(mask), step)]
+    tasks = ((gtab, rows[c[0]:c[1]]) for c in chunks)
+
+    if workers > 1:
+        results = bounded_imap(fit_chunk, tasks, workers, backlog)
+    else:
+        results = (fit_chunk(task) for task in tasks)
+    for result, c in zip(results, chunks):
+        params[c[0]:c[1]] = result
+    return TensorFit(model, params)
+
+
+def save_tensors(fname, tensors, mask, affine):
+    """
+    Saves the tensors within a mask as the six lower triangular components
+    (Dxx, Dxy, Dyy, Dxz, Dyz, Dzz) of each, in float32, along with the mask
+    and affine of the volume. The file is uncompressed, so that the tensors
+    can be memory-mapped by tensor_file.
+
+    **Positional Arguments:**
+
+            fname:
+                - Filename for the tensors (.npz)
+            tensors:
+                - Volume TensorFit, with the parameters of the tensors fit by
+                  fit_masked scattered into the volume
+            mask:
+                - Brain mask within which tensors were fit
+            affine:
+                - Affine of the volume the tensors were fit to
+    """
+    vox = masked_volume(mask)
+    params = vox.gather(tensors.model_params)
+    evals, evecs = params[:, 0:3], params[:, 3:12].reshape(-1, 3, 3)
+    quadratic = np.einsum('nij,nj,nkj->nik', evecs, evals, evecs)
+    np.savez(fname, lower=lower_triangular(quadratic).astype(np.float32),
+             mask=np.packbits(np.asarray(mask).ravel() > 0),
+             shape=np.array(vox.shape), affine=np.asarray(affine))
+    print("Tensors of " + str(len(vox)) + " voxels saved to " + fname)
+    pass
+
+
+class tensor_file(object):
+    def __init__(self, fname, mmap=True):
+        """
+        Tensors saved by save_tensors. Eigenvalues, eigenvectors, and FA are
+        only computed from the stored components when first used, and are
+        returned as volumes.
+
+        **Positional Arguments:**
+
+                fname:
+                    - Name of the tensors file
+
+        **Optional Arguments:**
+
+                mmap:
+                    - Whether to memory-map the tensors rather than read them
+        """
+        arrays = load_npz(fname, mmap=mmap)
+        self.shape = tuple(int(x) for x in arrays['shape'])
+        self.affine = np.asarray(arrays['affine'])
+        mask = np.unpackbits(np.asarray(arrays['mask']))
+        self.mask = mask[0:int(np.prod(self.shape))].reshape(self.shape) > 0
+        self.lower = arrays['lower']
+        self.vox = masked_volume(self.mask)
+        self.decomposed = None
+        pass
+
+    def __len__(self):
+        return len(self.vox)
+
+    def decompose(self):
+        """
+        Returns the eigenvalues and eigenvectors of the masked tensors,
+        computing them on first use
+        """
+        if self.decomposed is None:
+            lower = np.asarray(self.lower, dtype=np.float64)
+            self.decomposed = decompose_tensor(from_lower_triangular(lower))
+        return self.decomposed
+
+    @property
+    def evals(self):
+        """
+        Eigenvalues of every tensor, as a volume
+        """
+        return self.vox.scatter(self.decompose()[0])
+
+    @property
+    def evecs(self):
+        """
+        Eigenvectors of every tensor, as a volume
+        """
+        return self.vox.scatter(self.decompose()[1])
+
+    @property
+    def fa(self):
+        """
+        Fractional anisotropy of every tensor, as a volume
+        """
+        return self.vox.scatter(fractional_anisotropy(self.decompose()[0]))
+
+    def tensor_fit(self, gtab):
+        """
+        Returns the tensors as a volume TensorFit, with zeros outside of the
+        mask
+
+        **Positional Arguments:**
+
+                gtab:
+                    - dipy formatted bval/bvec Structure
+        """
+        evals, evecs = self.decompose()
+        params = np.concatenate([evals, evecs.reshape(-1, 9)], axis=1)
+        return TensorFit(TensorModel(gtab), self.vox.scatter(params))
@@ -22,12 +22,21 @@ from __future__ import print_function
 
 import numpy as np
 import nibabel as nb
-from dipy.reconst.dti import TensorModel, fractional_anisotropy, quantize_evecs
+from dipy.reconst.dti import (TensorModel, TensorFit, fractional_anisotropy,
+                              quantize_evecs)
 from dipy.reconst.csdeconv import (ConstrainedSphericalDeconvModel,
                                    auto_response)
 from dipy.direction import peaks_from_model
-from dipy.tracking.eudx import EuDX
 from dipy.data import get_sphere
+from ndmg.track.tensors import fit_masked
+from ndmg.utils.masked import masked_volume
+from ndmg.track.parallel import eudx_shards, limit_tracks
+from ndmg.track.seeds import make_seeds
+from ndmg.track.cache import tensor_cache, fit_key
+from ndmg.track.compress import compress_chunks
+from ndmg.graph.streamlines import iter_chunks
+from ndmg.register.transforms import transform_chunks
+from ndmg.utils.fibers import fiber_writer
 
 
 class track():
@@ -39,11 +48,19 @@ class track():
         # WGR:TODO rewrite help text
         pass
 
-    def eudx_basic(self, dti_file, mask_file, gtab, stop_val=0.1):
+    def eudx_basic(self, dti_file, mask_file, gtab, stop_val=0.1, workers=1,
+                   memory=2**30, fibers=None, chunk_size=10000,
+                   seeding='voxel', nseeds=1, stride=1, seed_fa=None,
+                   random_state=0, max_streamlines=None, time_budget=None,
+                   cache=None, cache_size=2**33, tolerance=None, step=None,
+                   transform=None):
         """
         Tracking with basic tensors and basic eudx - experimental
-        We now force seeding at every voxel in the provided mask for
-        simplicity.  Future functionality will extend these options.
+        By default, a seed is placed at every voxel in the provided mask.
+        Other seeding strategies (see ndmg.track.seeds.make_seeds) bound the
+        number of seeds, and so the runtime and size of the fibers. Tracking
+        can also be stopped after a number of streamlines or seconds, in
+        which case seeds are tracked in a random order.
         **Positional Arguments:**
 
                 dti_file:
@@ -56,24 +73,138 @@ class track():
         **Optional Arguments:**
                 stop_val:
                     - Value to cutoff fiber track
+                workers:
+                    - Number of processes across which tensors are fit, in
+                      slabs of the volume, and fibers are tracked, in shards
+                      of the seeds
+                memory:
+                    - Approximate number of bytes of data fit at once by
+                      each process
+                fibers:
+                    - Filename to which streamlines are written as they are
+                      tracked. If given, a lazy fibers handle to the file is
+                      returned in place of the list of streamlines.
+                chunk_size:
+                    - Number of streamlines buffered before being written
+                seeding:
+                    - Seeding strategy: voxel, count, density, or grid
+                nseeds:
+                    - Total number of seeds (count), or seeds per voxel
+                      (density)
+                stride:
+                    - Spacing, in voxels, of the seed grid (grid)
+                seed_fa:
+                    - FA at or below which voxels are not seeded
+                random_state:
+                    - Seed of the random number generator used to place and
+                      order seeds
+                max_streamlines:
+                    - Number of streamlines after which tracking stops
+                time_budget:
+                    - Number of seconds after which tracking stops. The
+                      fraction of seeds tracked is stored with the fibers.
+                cache:
+                    - Directory in which tensor fits are cached, keyed by the
+                      contents of the DTI and mask files and gtab, so that
+                      tracking can be rerun without refitting tensors
+                cache_size:
+                    - Number of bytes of fits kept in the cache
+                tolerance:
+                    - Streamlines are simplified so that no removed point is
+                      further than this many voxels from them
+                step:
+                    - Streamlines are resampled to points no further than this
+                      many voxels apart
+                transform:
+                    - 4x4 affine applied to the points of every streamline,
+                      before they are compressed, such as from voxels of a
+                      native space DTI image to voxels of an atlas
         """
 
-        img = nb.load(dti_file)
-        data = img.get_data()
+        # Only the bounding box of the mask is read from the DTI volume
+        data = nb.load(dti_file).dataobj
+        mask = nb.load(mask_file).get_data()
+        vox = masked_volume(mask)
 
-        img = nb.load(mask_file)
-
-        mask = img.get_data()
-
-        # use all points in mask
-        seedIdx = np.where(mask > 0)  # seed everywhere not equal to zero
-        seedIdx = np.transpose(seedIdx)
-
-        model = TensorModel(gtab)
-        ten = model.fit(data, mask)
+        # Tensors and their directions are only computed within the mask,
+        # or are reused from the cache if they were fit to the same data
         sphere = get_sphere('symmetric724')
-        ind = quantize_evecs(ten.evecs, sphere.vertices)
-        eu = EuDX(a=ten.fa, ind=ind, seeds=seedIdx,
-                  odf_vertices=sphere.vertices, a_low=stop_val)
-        tracks = [e for e in eu]
+        model = TensorModel(gtab)
+        if cache is not None:
+            cache = tensor_cache(cache, cache_size)
+            key = fit_key(dti_file, mask_file, gtab, 'symmetric724')
+            cached = cache.get(key)
+        else:
+            cached = None
+        if cached is None:
+            fit = fit_masked(data, vox, gtab, workers=workers, memory=memory)
+            params = fit.model_params
+            fa = fit.fa
+            ind = quantize_evecs(fit.evecs, sphere.vertices)
+            if cache is not None:
+                cache.put(key, params=params, fa=fa, ind=ind)
+        else:
+            print("Using cached tensor fit: " + cache.path(key))
+            params, fa, ind = cached['params'], cached['fa'], cached['ind']
+        ten = TensorFit(model, vox.scatter(params))
+        fa = vox.scatter(fa)
+        ind = vox.scatter(ind)
+        seedIdx = make_seeds(mask, seeding, nseeds=nseeds, stride=stride,
+                             fa=fa, fa_thresh=seed_fa,
+                             random_state=random_state)
+        print("Tracking from " + str(len(seedIdx)) + " seeds...")
+        budget = max_streamlines is not None or time_budget is not None
+        if budget:
+            # A truncated run should still cover the whole mask evenly
+            order = np.random.RandomState(random_state).permutation(
+                len(seedIdx))
+            seedIdx = seedIdx[order]
+        # Smaller shards let budgets be checked more often
+        shards = eudx_shards(fa, ind, seedIdx, sphere.vertices, stop_val,
+                             workers, shard_size=1000 if budget else 10000)
+        status = dict()
+        eu = limit_tracks(shards, max_streamlines, time_budget, status)
+        compressed = tolerance is not None or step is not None
+        chunked = compressed or transform is not None
+        if chunked:
+            eu = iter_chunks(eu, chunk_size)
+        if transform is not None:
+            eu = transform_chunks(eu, transform)
+        if compressed:
+            eu = compress_chunks(eu, tolerance, step, status)
+        if fibers is None and chunked:
+            tracks = [points[o[i]:o[i+1]] for points, o in eu
+                      for i in range(len(o) - 1)]
+        elif fibers is None:
+            tracks = [e for e in eu]
+        else:
+            writer = fiber_writer(fibers, chunk_size)
+            try:
+                if chunked:
+                    for points, offsets in eu:
+                        writer.write_chunk(points, offsets)
+                else:
+                    writer.extend(eu)
+            except BaseException:
+                writer.abort()
+                raise
+        if compressed:
+            print("Compressed %d streamline points to %d" %
+                  (status['raw_points'], status['compressed_points']))
+        nseeds = len(seedIdx)
+        status.update(nseeds=nseeds, seed_coverage=(
+            status['seeds_tracked'] / float(nseeds) if nseeds else 1.0))
+        if status['seeds_tracked'] == nseeds:
+            status['stopped'] = 'complete'
+        print("Tracked %d of %d seeds (%.1f%%) in %.1fs, stopped: %s" %
+              (status['seeds_tracked'], nseeds,
+               100 * status['seed_coverage'], status['elapsed'],
+               status['stopped']))
+        if fibers is not None:
+            writer.attr.update(status, seeding=seeding,
+                               max_streamlines=max_streamlines,
+                               time_budget=time_budget, tolerance=tolerance,
+                               step=step, transform=None if transform is None
+                               else np.asarray(transform).tolist())
+            tracks = writer.close()
         return (ten, tracks)
@@ -2,3 +2,7 @@ from __future__ import absolute_import
 # Prevent typing multilevel imports
 from .utils import utils
 from .loadGraphs import loadGraphs
+from .sparse_graph import sparse_graph, load_sparse_graph
+from .cohort import cohort, save_cohort
+from .fibers import fibers, fiber_writer
+from .masked import masked_volume
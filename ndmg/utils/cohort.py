@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+
+# Copyright 2016 NeuroData (http://neurodata.io)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# cohort.py
+# Created by agent on 2026-10-17.
+# Email: agent@local
+
+from __future__ import print_function
+
+from tempfile import mkdtemp
+from ndmg.utils.loadGraphs import loadGraphs
+from ndmg.utils.sparse_graph import sparse_graph, node_ids
+from ndmg.utils.npz import load_npz, zip_arrays
+import numpy as np
+import scipy.sparse as sp
+import os.path as op
+import shutil
+import json
+
+
+def graph_edges(fname):
+    """
+    Loads a single graph and returns its node labels and weighted edges
+
+    **Positional Arguments:**
+
+            fname:
+                - Graph file, in any format read by loadGraphs
+
+    **Returns:**
+
+            ids:
+                - Label of every node
+            a, b, w:
+                - Labels of the endpoints of each edge, and its weight
+    """
+    g = list(loadGraphs(fname).values())[0]
+    if isinstance(g, sparse_graph):
+        ids = np.asarray(g.ids)
+        coo = g.adj.tocoo()
+        return ids, ids[coo.row], ids[coo.col], coo.data
+    edges = list(g.edges(data='weight', default=1))
+    if not edges:
+        return node_ids(g.nodes()), np.zeros(0), np.zeros(0), np.zeros(0)
+    a, b, w = zip(*edges)
+    return node_ids(g.nodes()), node_ids(a), node_ids(b), np.array(w)
+
+
+def save_cohort(fname, filenames, sparse=None, verb=False):
+    """
+    Packs the graphs of one parcellation for a set of subjects into a single
+    uncompressed .npz file, which can be memory-mapped with cohort. Nodes
+    from every graph are merged into one table of labels. Graphs are stored
+    either as a dense, symmetric, (subjects, N, N) float32 array, or as the
+    upper triangles of each adjacency matrix stacked into one (subjects * N,
+    N) CSR matrix.
+
+    **Positional Arguments:**
+
+            fname:
+                - Filename for the cohort (.npz)
+            filenames:
+                - List of graph files, in any format read by loadGraphs
+
+    **Optional Arguments:**
+
+            sparse:
+                - Whether to store the graphs as stacked CSR matrices rather
+                  than a dense array. Defaults to doing so when there are
+                  more than 1000 nodes.
+            verb:
+                - Toggles verbose output statements
+    """
+    subjects = []
+    edges = []
+    for f in filenames:
+        if verb:
+            print("Loading: " + f)
+        subjects.append(op.basename(f))
+        edges.append(graph_edges(f))
+    if not subjects:
+        raise ValueError('No graphs were given for the cohort ' + fname)
+    ids = np.unique(np.concatenate([e[0] for e in edges]))
+    n = len(ids)
+    if sparse is None:
+        sparse = n > 1000
+
+    attr = dict(nsubjects=len(subjects), nnodes=n,
+                layout='sparse' if sparse else 'dense')
+    arrays = dict(subjects=np.array(subjects), ids=ids,
+                  attr=np.array(json.dumps(attr)))
+    tmpdir = mkdtemp(prefix='ndmg_cohort_')
+    try:
+        mats = []
+        for s, (gids, a, b, w) in enumerate(edges):
+            i = np.searchsorted(ids, a)
+            j = np.searchsorted(ids, b)
+            rows, cols = np.minimum(i, j), np.maximum(i, j)
+            if sparse:
+                mat = sp.coo_matrix((np.asarray(w, dtype=np.float32),
+                                     (rows, cols)), shape=(n, n)).tocsr()
+                mat.sort_indices()
+                mats.append(mat)
+                continue
+            if s == 0:
+                adj = np.lib.format.open_memmap(op.join(tmpdir, 'adj.npy'),
+                                                mode='w+', dtype=np.float32,
+                                                shape=(len(edges), n, n))
+            adj[s, rows, cols] = w
+            adj[s, cols, rows] = w
+        if sparse:
+            stack = sp.vstack(mats, format='csr') if mats else \
+                sp.csr_matrix((0, n), dtype=np.float32)
+            arrays.update(indptr=stack.indptr, indices=stack.indices,
+                          weight=stack.data.astype(np.float32))
+        elif edges:
+            adj.flush()
+            del adj
+        for name, x in arrays.items():
+            np.save(op.join(tmpdir, name + '.npy'), x)
+        names = sorted(arrays) + ([] if sparse or not edges else ['adj'])
+        zip_arrays(fname, tmpdir, names)
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    print("Cohort of " + str(len(subjects)) + " graphs with " + str(n) +
+          " nodes saved to " + fname)
+    pass
+
+
+class cohort(object):
+    def __init__(self, fname, mmap=True):
+        """
+        Graphs of one parcellation for a set of subjects, as saved by
+        save_cohort. Arrays are memory-mapped, so that only the subjects or
+        edges which are accessed are read from disk.
+
+        **Positional Arguments:**
+
+                fname:
+                    - Name of the cohort file
+
+        **Optional Arguments:**
+
+                mmap:
+                    - Whether to memory-map the arrays rather than read them
+        """
+        self.arrays = load_npz(fname, mmap=mmap)
+        self.attr = json.loads(str(self.arrays['attr']))
+        self.subjects = [str(s) for s in self.arrays['subjects']]
+        self.index = dict((s, i) for i, s in enumerate(self.subjects))
+        self.ids = self.arrays['ids']
+        self.sparse = self.attr['layout'] == 'sparse'
+        pass
+
+    def __len__(self):
+        return len(self.subjects)
+
+    def subject(self, key):
+        """
+        Returns the position of a subject, given its name or position
+        """
+        if isinstance(key, str):
+            return self.index[key]
+        return int(key)
+
+    def adjacency(self, key):
+        """
+        Returns the full, symmetric, adjacency matrix of a subject, as an
+        array for dense cohorts or a scipy.sparse CSR matrix otherwise
+
+        **Positional Arguments:**
+
+                key:
+                    - Subject name (graph file basename) or position
+        """
+        s = self.subject(key)
+        if not self.sparse:
+            return self.arrays['adj'][s]
+        n = len(self.ids)
+        indptr = np.asarray(self.arrays['indptr'][s*n:(s+1)*n+1])
+        start, stop = indptr[0], indptr[-1]
+        upper = sp.csr_matrix((self.arrays['weight'][start:stop],
+                               self.arrays['indices'][start:stop],
+                               indptr - start), shape=(n, n))
+        return upper + upper.T
+
+    def node(self, label):
+        """
+        Returns the row of a node label, raising a KeyError if the node is
+        not in the cohort
+        """
+        i = int(np.searchsorted(self.ids, label))
+        if i >= len(self.ids) or self.ids[i] != label:
+            raise KeyError(label)
+        return i
+
+    def edge(self, a, b):
+        """
+        Returns the weight of one edge for every subject. A KeyError is
+        raised if either node is not in the cohort.
+
+        **Positional Arguments:**
+
+                a, b:
+                    - Labels of the nodes joined by the edge
+        """
+        i, j = sorted((self.node(a), self.node(b)))
+        if not self.sparse:
+            return np.asarray(self.arrays['adj'][:, i, j])
+        n = len(self.ids)
+        indptr = self.arrays['indptr']
+        weights = np.zeros(len(self.subjects), dtype=np.float32)
+        for s in range(len(self.subjects)):
+            start, stop = indptr[s*n + i], indptr[s*n + i + 1]
+            row = np.asarray(self.arrays['indices'][start:stop])
+            k = np.searchsorted(row, j)
+            if k < len(row) and row[k] == j:
+                weights[s] = self.arrays['weight'][start + k]
+        return weights
@@ -0,0 +1,252 @@
+#!/usr/bin/env python
+
+# Copyright 2016 NeuroData (http://neurodata.io)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# convert.py
+# Created by agent on 2026-10-17.
+# Email: agent@local
+
+from __future__ import print_function
+
+from multiprocessing import Pool
+from ndmg.utils.sparse_graph import load_sparse_graph, save_sparse_graph
+from ndmg.utils.sparse_graph import sparse_graph, from_networkx
+from ndmg.utils.sparse_graph import is_sparse_graph
+import networkx as nx
+import os.path as op
+import time
+import os
+
+# File extension of each graph format
+formats = dict(gpickle='.gpickle', graphml='.graphml', edgelist='.edgelist',
+               npz='.npz')
+
+# Formats from the most to the least complete, which decides the input used
+# when graphs of several formats would be converted to the same output
+priority = ('npz', 'gpickle', 'graphml', 'edgelist')
+
+
+def graph_format(fname):
+    """
+    Returns the format of a graph file from its extension, or None. Other
+    .npz derivatives, such as fibers, tensors, or cohorts, are not graphs.
+    """
+    for fmt, ext in formats.items():
+        if fname.endswith(ext):
+            break
+    else:
+        return None
+    if fmt == 'npz' and op.isfile(fname) and not is_sparse_graph(fname):
+        return None
+    return fmt
+
+
+def read_graph(fname):
+    """
+    Reads a graph in any supported format. Compact (.npz) graphs are returned
+    as sparse_graph objects, and all others as networkx graphs.
+
+    **Positional Arguments:**
+
+            fname:
+                - Graph file
+    """
+    fmt = graph_format(fname)
+    if fmt == 'npz':
+        return load_sparse_graph(fname)
+    elif fmt == 'graphml':
+        return nx.read_graphml(fname)
+    elif fmt == 'gpickle':
+        return nx.read_gpickle(fname)
+    elif fmt == 'edgelist':
+        return nx.read_edgelist(fname, data=True)
+    raise ValueError('Unknown graph format: ' + fname)
+
+
+def write_graph(g, fname, fmt):
+    """
+    Writes a graph, read by read_graph, in the given format. Edge lists keep
+    edge attributes but not isolated nodes or graph attributes.
+
+    **Positional Arguments:**
+
+            g:
+                - networkx graph or sparse_graph
+            fname:
+                - Filename for the graph
+            fmt:
+                - Output graph format: gpickle, graphml, edgelist, or npz
+    """
+    if fmt == 'npz':
+        if not isinstance(g, sparse_graph):
+            g = from_networkx(g)
+        save_sparse_graph(fname, g)
+        return
+    if isinstance(g, sparse_graph):
+        g = g.to_networkx()
+    if fmt == 'gpickle':
+        nx.write_gpickle(g, fname)
+    elif fmt == 'graphml':
+        nx.write_graphml(g, fname)
+    elif fmt == 'edgelist':
+        nx.write_edgelist(g, fname, data=True)
+    else:
+        raise ValueError('fmt must be one of gpickle, graphml, edgelist, ' +
+                         'or npz')
+    pass
+
+
+def convert_graph(task):
+    """
+    Converts a single graph, returning the input file, its size so that
+    throughput can be reported, and the error which stopped it from being
+    converted, if any
+
+    **Positional Arguments:**
+
+            task:
+                - Tuple of the input file, output file, and output format
+    """
+    infile, outfile, fmt = task
+    if not op.isdir(op.dirname(outfile) or '.'):
+        try:
+            os.makedirs(op.dirname(outfile))
+        except OSError:
+            pass
+    try:
+        write_graph(read_graph(infile), outfile, fmt)
+    except Exception as e:
+        # A partial output would otherwise be skipped as up to date
+        if op.exists(outfile):
+            os.remove(outfile)
+        return infile, 0, type(e).__name__ + ': ' + str(e)
+    return infile, op.getsize(infile), None
+
+
+def up_to_date(infile, outfile):
+    """
+    Whether an output exists and is at least as new as its input
+    """
+    return (op.exists(outfile) and
+            op.getmtime(outfile) >= op.getmtime(infile))
+
+
+def convert_tree(indir, outdir, fmt, workers=1, force=False, informat=None,
+                 verb=False):
+    """
+    Converts every graph in a directory tree to another format, across a pool
+    of processes. The tree is mirrored in the output directory, and outputs
+    which are newer than their inputs are skipped. When graphs in several
+    formats share a name, only the most complete (see priority) is
+    converted. Graphs which cannot be converted are reported once every
+    other graph has been converted.
+
+    **Positional Arguments:**
+
+            indir:
+                - Directory which is crawled for graphs
+            outdir:
+                - Directory in which converted graphs are written. May be the
+                  same as the input directory.
+            fmt:
+                - Output graph format: gpickle, graphml, edgelist, or npz
+
+    **Optional Arguments:**
+
+            workers:
+                - Number of processes to use
+            force:
+                - Whether to convert graphs whose outputs are up to date
+            informat:
+                - Only converts graphs of this format. Defaults to every
+                  format other than the output format.
+            verb:
+                - Toggles verbose output statements
+    """
+    if fmt not in formats:
+        raise ValueError('fmt must be one of gpickle, graphml, edgelist, ' +
+                         'or npz')
+    # Inputs sharing a name in different formats map onto the same output,
+    # of which only the most complete is converted
+    candidates = dict()
+    for root, dirs, files in os.walk(indir):
+        dirs.sort()
+        for fl in sorted(files):
+            infmt = graph_format(op.join(root, fl))
+            if infmt is None or infmt == fmt:
+                continue
+            if informat is not None and infmt != informat:
+                continue
+            outfile = op.join(outdir, op.relpath(root, indir),
+                              fl[:-len(formats[infmt])] + formats[fmt])
+            candidates.setdefault(outfile, []).append(
+                (priority.index(infmt), op.join(root, fl)))
+
+    tasks = []
+    skipped = 0
+    shadowed = 0
+    for outfile in sorted(candidates):
+        inputs = sorted(candidates[outfile])
+        infile = inputs[0][1]
+        for rank, other in inputs[1:]:
+            print("Skipping " + other + ": " + infile + " is also " +
+                  "converted to " + outfile)
+        shadowed += len(inputs) - 1
+        if not force and up_to_date(infile, outfile):
+            skipped += 1
+            continue
+        tasks.append((infile, outfile, fmt))
+    print("Converting " + str(len(tasks)) + " graphs to " + fmt +
+          " (" + str(skipped) + " up to date, " + str(shadowed) +
+          " with the same output)...")
+
+    start = time.time()
+    nbytes = 0
+    failed = []
+    if workers > 1:
+        pool = Pool(workers)
+        results = pool.imap_unordered(convert_graph, tasks,
+                                      max(1, len(tasks) // (workers * 16)))
+    else:
+        pool = None
+        results = (convert_graph(task) for task in tasks)
+    try:
+        for idx, (infile, size, error) in enumerate(results):
+            nbytes += size
+            if error is not None:
+                failed.append((infile, error))
+            if verb or (idx + 1) % 1000 == 0:
+                print("Converted " + str(idx + 1) + " of " +
+                      str(len(tasks)) + " graphs")
+    except BaseException:
+        if pool is not None:
+            pool.terminate()
+        raise
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    elapsed = max(time.time() - start, 1e-6)
+    converted = len(tasks) - len(failed)
+    print("Converted %d graphs in %.1fs (%.1f graphs/s, %.2f MB/s)" %
+          (converted, elapsed, converted / elapsed,
+           nbytes / elapsed / 2**20))
+    if failed:
+        print("Failed to convert " + str(len(failed)) + " graphs:")
+        for infile, error in sorted(failed):
+            print("  " + infile + ": " + error)
+    return converted, skipped + shadowed, failed
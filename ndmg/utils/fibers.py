@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+
+# Copyright 2016 NeuroData (http://neurodata.io)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# fibers.py
+# Created by agent on 2026-10-17.
+# Email: agent@local
+
+from __future__ import print_function
+
+from tempfile import mkdtemp
+from ndmg.utils.npz import load_npz, zip_arrays, npy_writer
+import numpy as np
+import os.path as op
+import zipfile
+import shutil
+import json
+
+
+class fiber_writer(object):
+    def __init__(self, fname, chunk_size=10000, attr=None, tmpdir=None):
+        """
+        Writes streamlines to disk as they are produced, a chunk at a time,
+        rather than holding them all in memory. Points are stored as a single
+        float32 array, with the offset of each streamline into it, in an
+        uncompressed .npz file which is written when the writer is closed.
+
+        **Positional Arguments:**
+
+                fname:
+                    - Filename for the fibers (.npz)
+
+        **Optional Arguments:**
+
+                chunk_size:
+                    - Number of streamlines buffered before being written
+                attr:
+                    - Dictionary of attributes stored with the fibers
+                tmpdir:
+                    - Directory in which the arrays are written while
+                      streaming. Defaults to the directory of fname, so that
+                      no other filesystem needs room for the fibers.
+        """
+        self.fname = fname
+        self.chunk_size = chunk_size
+        self.attr = dict(attr or {})
+        if tmpdir is None:
+            tmpdir = op.dirname(fname) or '.'
+        self.tmpdir = mkdtemp(prefix='.ndmg_fibers_', dir=tmpdir)
+        self.points = npy_writer(op.join(self.tmpdir, 'points.npy'),
+                                 np.float32, width=3)
+        self.offsets = npy_writer(op.join(self.tmpdir, 'offsets.npy'),
+                                  np.int64)
+        self.offsets.write(np.zeros(1, dtype=np.int64))
+        self.buffer = []
+        self.npoints = 0
+        self.nlines = 0
+        pass
+
+    def write(self, streamline):
+        """
+        Adds a single (n, 3) streamline
+        """
+        self.buffer.append(streamline)
+        if len(self.buffer) >= self.chunk_size:
+            self.flush()
+        pass
+
+    def extend(self, streamlines):
+        """
+        Adds every streamline of an iterable
+        """
+        for s in streamlines:
+            self.write(s)
+        pass
+
+    def write_chunk(self, points, offsets):
+        """
+        Adds streamlines which are already concatenated, as points and the
+        offsets of each streamline into them
+        """
+        self.flush()
+        points = np.asarray(points, dtype=np.float32).reshape(-1, 3)
+        offsets = np.asarray(offsets, dtype=np.int64)
+        self.points.write(points[offsets[0]:offsets[-1]])
+        self.offsets.write(self.npoints + offsets[1:] - offsets[0])
+        self.npoints += int(offsets[-1] - offsets[0])
+        self.nlines += len(offsets) - 1
+        pass
+
+    def flush(self):
+        """
+        Appends the buffered streamlines to the files being streamed
+        """
+        if not self.buffer:
+            return
+        lengths = np.array([len(s) for s in self.buffer], dtype=np.int64)
+        points = [np.asarray(s, dtype=np.float32).reshape(-1, 3)
+                  for s in self.buffer if len(s)]
+        if points:
+            self.points.write(np.concatenate(points))
+        self.offsets.write(self.npoints + np.cumsum(lengths))
+        self.npoints += int(lengths.sum())
+        self.nlines += len(lengths)
+        self.buffer = []
+        pass
+
+    def close(self):
+        """
+        Writes the remaining streamlines and packs the fibers into their
+        final file, returning a lazy fibers handle to it
+        """
+        self.flush()
+        self.points.close()
+        self.offsets.close()
+        attr = dict(self.attr, nlines=self.nlines, npoints=self.npoints)
+        np.save(op.join(self.tmpdir, 'attr.npy'), np.array(json.dumps(attr)))
+        try:
+            zip_arrays(self.fname, self.tmpdir, ['points', 'offsets', 'attr'])
+        finally:
+            shutil.rmtree(self.tmpdir, ignore_errors=True)
+        print(str(self.nlines) + " streamlines saved to " + self.fname)
+        return fibers(self.fname)
+
+    def abort(self):
+        """
+        Discards everything written so far
+        """
+        self.points.fp.close()
+        self.offsets.fp.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+        pass
+
+
+def load_legacy(fname):
+    """
+    Reads fibers saved by np.savez as a single (pickled) array of
+    streamlines, returning their concatenated points and offsets
+
+    **Positional Arguments:**
+
+            fname:
+                - Name of the fibers file
+    """
+    with np.load(fname, allow_pickle=True) as npz:
+        tracks = npz[npz.files[0]]
+    lengths = np.array([len(t) for t in tracks], dtype=np.int64)
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    points = np.zeros((offsets[-1], 3), dtype=np.float32)
+    for i, t in enumerate(tracks):
+        points[offsets[i]:offsets[i+1]] = np.reshape(t, (-1, 3))
+    return points, offsets
+
+
+class fibers(object):
+    def __init__(self, fname, mmap=True):
+        """
+        Lazy handle to streamlines saved by fiber_writer. The points are
+        memory-mapped, and streamlines are only read as they are iterated or
+        indexed. Fibers saved by np.savez as an array of streamlines are
+        also read, though they are loaded into memory.
+
+        **Positional Arguments:**
+
+                fname:
+                    - Name of the fibers file
+
+        **Optional Arguments:**
+
+                mmap:
+                    - Whether to memory-map the points rather than read them
+        """
+        self.fname = fname
+        with zipfile.ZipFile(fname) as zf:
+            legacy = 'points.npy' not in zf.namelist()
+        if legacy:
+            self.points, self.offsets = load_legacy(fname)
+            self.attr = dict(nlines=len(self.offsets) - 1,
+                             npoints=len(self.points), legacy=True)
+            return
+        arrays = load_npz(fname, mmap=mmap)
+        self.points = arrays['points']
+        self.offsets = np.asarray(arrays['offsets'])
+        self.attr = json.loads(str(arrays['attr']))
+        pass
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, key):
+        """
+        Returns one streamline by its position, or a list of streamlines
+        given a slice or sequence of positions
+        """
+        if isinstance(key, slice):
+            key = range(*key.indices(len(self)))
+        elif np.ndim(key) == 0:
+            i = int(key)
+            if i < 0:
+                i += len(self)
+            if not 0 <= i < len(self):
+                raise IndexError('fiber index out of range')
+            return self.points[self.offsets[i]:self.offsets[i+1]]
+        return [self[i] for i in key]
+
+    def lengths(self):
+        """
+        Returns the number of points in every streamline
+        """
+        return np.diff(self.offsets)
+
+    def __iter__(self):
+        o = self.offsets
+        for i in range(len(self)):
+            yield self.points[o[i]:o[i+1]]
+
+    def chunks(self, chunk_size):
+        """
+        Yields the streamlines a chunk at a time, as concatenated points and
+        offsets (see ndmg.graph.streamlines.concatenate), without splitting
+        them into separate arrays
+
+        **Positional Arguments:**
+
+                chunk_size:
+                    - Number of streamlines per chunk
+        """
+        for start in range(0, len(self), chunk_size):
+            o = self.offsets[start:start + chunk_size + 1]
+            yield np.asarray(self.points[o[0]:o[-1]]), o - o[0]
@@ -22,12 +22,13 @@
 from __future__ import print_function
 
 from collections import OrderedDict
+from ndmg.utils.sparse_graph import load_sparse_graph, is_sparse_graph
 
 import networkx as nx
 import os
 
 
-def loadGraphs(filenames, verb=False):
+def loadGraphs(filenames, verb=False, networkx=False, mmap=False):
     """
     Given a list of files, returns a dictionary of graphs
 
@@ -37,6 +38,12 @@ def loadGraphs(filenames, verb=False):
     Optional parameters:
         verb:
             - Toggles verbose output statements
+        networkx:
+            - Whether graphs in the compact (.npz) format are returned as
+              networkx graphs. Otherwise they are returned as sparse_graph
+              objects, which hold the adjacency matrix directly.
+        mmap:
+            - Whether uncompressed .npz graphs are memory-mapped
     """
     #  Initializes empty dictionary
     if type(filenames) is not list:
@@ -47,6 +54,13 @@ def loadGraphs(filenames, verb=False):
             print("Loading: " + files)
         #  Adds graphs to dictionary with key being filename
         fname = os.path.basename(files)
+        if files.endswith('.npz'):
+            if not is_sparse_graph(files):
+                raise ValueError(files + ' is not a graph')
+            gstruct[fname] = load_sparse_graph(files, mmap=mmap)
+            if networkx:
+                gstruct[fname] = gstruct[fname].to_networkx()
+            continue
         try:
             gstruct[fname] = nx.read_graphml(files)
         except:
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+
+# Copyright 2016 NeuroData (http://neurodata.io)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# masked.py
+# Created by agent on 2026-10-17.
+# Email: agent@local
+
+from __future__ import print_function
+
+import numpy as np
+
+
+def mask_bounds(mask):
+    """
+    Returns the bounding box of the non-zero voxels of a mask, as a tuple of
+    slices, or None if the mask is empty
+
+    **Positional Arguments:**
+
+            mask:
+                - Binary mask
+    """
+    idx = np.nonzero(mask)
+    if len(idx[0]) == 0:
+        return None
+    return tuple(slice(int(i.min()), int(i.max()) + 1) for i in idx)
+
+
+class masked_volume(object):
+    def __init__(self, mask):
+        """
+        Maps between volumes and matrices holding only the voxels within a
+        mask, one row per voxel in C order. Volumes are cropped to the
+        bounding box of the mask before being read, so that a 4D volume
+        (such as a nibabel image's dataobj) is gathered into an (n_voxels,
+        n_volumes) matrix without the rest of the volume being loaded.
+
+        **Positional Arguments:**
+
+                mask:
+                    - Binary mask
+        """
+        mask = np.asarray(mask)
+        self.shape = mask.shape[0:3]
+        self.box = mask_bounds(mask)
+        if self.box is None:
+            self.box = tuple(slice(0, 0) for s in self.shape)
+        self.inside = np.asarray(mask[self.box]) > 0
+        self.n = int(self.inside.sum())
+        pass
+
+    def __len__(self):
+        return self.n
+
+    def crop(self, volume):
+        """
+        Returns the bounding box of the mask within a volume
+        """
+        return np.asarray(volume[self.box])
+
+    def gather(self, volume):
+        """
+        Returns the voxels of a 3D or 4D volume which are within the mask, as
+        a (n_voxels, ...) array
+
+        **Positional Arguments:**
+
+                volume:
+                    - Array, or array proxy, with the shape of the mask in
+                      its first three dimensions
+        """
+        return self.crop(volume)[self.inside]
+
+    def scatter(self, values, fill=0, dtype=None):
+        """
+        Places the rows of a matrix gathered with this mask back into a
+        volume, filling voxels outside of the mask
+
+        **Positional Arguments:**
+
+                values:
+                    - (n_voxels, ...) array
+
+        **Optional Arguments:**
+
+                fill:
+                    - Value of voxels outside of the mask
+                dtype:
+                    - Data type of the volume. Defaults to that of the values.
+        """
+        values = np.asarray(values)
+        out = np.empty(self.shape + values.shape[1:],
+                       dtype=dtype or values.dtype)
+        out[...] = fill
+        out[self.box][self.inside] = values
+        return out
+
+    def coordinates(self):
+        """
+        Returns the (n_voxels, 3) voxel coordinates of the rows
+        """
+        start = [s.start for s in self.box]
+        return np.argwhere(self.inside) + start
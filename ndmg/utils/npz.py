@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+
+# Copyright 2016 NeuroData (http://neurodata.io)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# npz.py
+# Created by agent on 2026-10-17.
+# Email: agent@local
+
+from __future__ import print_function
+
+import numpy as np
+import os.path as op
+import zipfile
+import struct
+
+# Bytes reserved for the header of each streamed .npy file
+header_size = 128
+
+
+def load_npz(fname, mmap=False):
+    """
+    Loads every array in a .npz file. If requested, arrays which are stored
+    uncompressed are memory-mapped rather than read into memory.
+
+    **Positional Arguments:**
+
+            fname:
+                - Name of the .npz file
+
+    **Optional Arguments:**
+
+            mmap:
+                - Whether to memory-map uncompressed arrays
+    """
+    if not mmap:
+        with np.load(fname) as npz:
+            return dict((key, npz[key]) for key in npz.files)
+
+    arrays = dict()
+    with zipfile.ZipFile(fname) as zf, open(fname, 'rb') as fp:
+        for info in zf.infolist():
+            key = info.filename[:-4]
+            if info.compress_type != zipfile.ZIP_STORED:
+                arrays[key] = np.lib.format.read_array(zf.open(info))
+                continue
+            # Skip the local file header to find the start of the .npy file
+            fp.seek(info.header_offset + 26)
+            nname, nextra = struct.unpack('<HH', fp.read(4))
+            fp.seek(info.header_offset + 30 + nname + nextra)
+            version = np.lib.format.read_magic(fp)
+            if version == (1, 0):
+                header = np.lib.format.read_array_header_1_0(fp)
+            else:
+                header = np.lib.format.read_array_header_2_0(fp)
+            shape, fortran, dtype = header
+            if dtype.hasobject or 0 in shape or shape == ():
+                fp.seek(info.header_offset + 30 + nname + nextra)
+                arrays[key] = np.lib.format.read_array(fp)
+                continue
+            arrays[key] = np.memmap(fname, dtype=dtype, mode='r',
+                                    offset=fp.tell(), shape=shape,
+                                    order='F' if fortran else 'C')
+    return arrays
+
+
+def npy_header(dtype, shape):
+    """
+    Builds a .npy (version 1.0) header of exactly header_size bytes, so that
+    it can be written over the space reserved at the start of a file once the
+    final shape of the array is known
+
+    **Positional Arguments:**
+
+            dtype:
+                - Data type of the array
+            shape:
+                - Shape of the array
+    """
+    header = "{'descr': %r, 'fortran_order': False, 'shape': %r, }" % (
+        np.dtype(dtype).str, tuple(int(x) for x in shape))
+    header = header.ljust(header_size - 11) + '\n'
+    return (b'\x93NUMPY\x01\x00' + struct.pack('<H', header_size - 10) +
+            header.encode('latin1'))
+
+
+class npy_writer(object):
+    def __init__(self, fname, dtype, width=None):
+        """
+        Writes an array to a .npy file a block of rows at a time, without
+        knowing its final length. Space for the header is reserved, and the
+        header is written once the writer is closed.
+
+        **Positional Arguments:**
+
+                fname:
+                    - Name of the .npy file
+                dtype:
+                    - Data type of the array
+
+        **Optional Arguments:**
+
+                width:
+                    - Number of columns, for a 2D array
+        """
+        self.dtype = np.dtype(dtype)
+        self.width = width
+        self.length = 0
+        self.fp = open(fname, 'wb')
+        self.fp.write(b'\0' * header_size)
+        pass
+
+    def write(self, rows):
+        """
+        Appends rows to the array
+        """
+        rows = np.asarray(rows, dtype=self.dtype)
+        if self.width is not None:
+            rows = rows.reshape(-1, self.width)
+        self.fp.write(np.ascontiguousarray(rows).tobytes())
+        self.length += len(rows)
+        pass
+
+    def close(self):
+        """
+        Writes the header and closes the file
+        """
+        shape = (self.length,) + (() if self.width is None else
+                                  (self.width,))
+        self.fp.seek(0)
+        self.fp.write(npy_header(self.dtype, shape))
+        self.fp.close()
+        pass
+
+
+def zip_arrays(fname, tmpdir, names):
+    """
+    Packs .npy files into an uncompressed .npz archive, streaming each file
+    so that arrays larger than memory can be stored
+
+    **Positional Arguments:**
+
+            fname:
+                - Name of the archive
+            tmpdir:
+                - Directory holding the .npy files
+            names:
+                - Names of the arrays to pack
+    """
+    with zipfile.ZipFile(fname, 'w', zipfile.ZIP_STORED,
+                         allowZip64=True) as zf:
+        for name in names:
+            zf.write(op.join(tmpdir, name + '.npy'), name + '.npy')
+    pass
+
+
+def npy_shape(zf, name):
+    """
+    Returns the shape of an array in an open .npz archive, reading only its
+    header
+    """
+    with zf.open(name + '.npy') as fp:
+        version = np.lib.format.read_magic(fp)
+        if version == (1, 0):
+            return np.lib.format.read_array_header_1_0(fp)[0]
+        return np.lib.format.read_array_header_2_0(fp)[0]
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+
+# Copyright 2016 NeuroData (http://neurodata.io)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pool.py
+# Created by agent on 2026-10-17.
+# Email: agent@local
+
+from __future__ import print_function
+
+from collections import deque
+from multiprocessing import Pool
+from multiprocessing.sharedctypes import RawArray
+import numpy as np
+
+
+def share_volume(vol):
+    """
+    Copies a volume into shared memory so that worker processes can read it
+    without it being pickled. Returns the buffer along with the dtype and
+    shape needed to view it as an array again.
+
+    **Positional Arguments:**
+
+            vol:
+                - Array to be shared
+    """
+    vol = np.ascontiguousarray(vol)
+    raw = RawArray('b', max(vol.nbytes, 1))
+    np.frombuffer(raw, dtype=vol.dtype, count=vol.size)[:] = vol.ravel()
+    return raw, vol.dtype.str, vol.shape
+
+
+def view_volume(shared):
+    """
+    Views a volume shared by share_volume as an array
+    """
+    raw, dtype, shape = shared
+    return np.frombuffer(raw, dtype=dtype,
+                         count=int(np.prod(shape))).reshape(shape)
+
+
+def bounded_imap(func, tasks, workers, backlog=2, initializer=None,
+                 initargs=()):
+    """
+    Applies a function to every task across a pool of processes, yielding
+    the results in order. Only a few tasks per process are in flight at once,
+    so the tasks may come from a generator without being fully materialized.
+    Closing the generator early, or an error in any task, terminates the
+    pool.
+
+    **Positional Arguments:**
+
+            func:
+                - Picklable function applied to each task
+            tasks:
+                - Iterable of arguments to func
+            workers:
+                - Number of processes to use
+
+    **Optional Arguments:**
+
+            backlog:
+                - Number of tasks queued per process
+            initializer:
+                - Function run by each process when it starts
+            initargs:
+                - Arguments to the initializer
+    """
+    pool = Pool(workers, initializer=initializer, initargs=initargs)
+    pending = deque()
+    try:
+        for task in tasks:
+            pending.append(pool.apply_async(func, (task,)))
+            if len(pending) >= workers * backlog:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+    except BaseException:
+        pool.terminate()
+        raise
+    else:
+        pool.close()
+    finally:
+        pool.join()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+
+# Copyright 2016 NeuroData (http://neurodata.io)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# sparse_graph.py
+# Created by agent on 2026-10-17.
+# Email: agent@local
+
+from __future__ import print_function
+
+from collections import OrderedDict
+from ndmg.utils.npz import load_npz, npy_shape
+import numpy as np
+import scipy.sparse as sp
+import networkx as nx
+import zipfile
+import json
+
+# Stored in every graph file, so that other .npz derivatives are never read
+# as graphs
+graph_marker = 'ndmg_sparse_graph'
+
+
+class sparse_graph(object):
+    def __init__(self, ids, adj, attr=None, edge_attr=None):
+        """
+        Lightweight connectome held as the upper triangle of its adjacency
+        matrix, as stored in ndmg's compact (.npz) graph format
+
+        **Positional Arguments:**
+
+                ids:
+                    - Label of each node, in matrix order
+                adj:
+                    - Upper triangular scipy.sparse CSR adjacency matrix
+                attr:
+                    - Dictionary of graph attributes
+                edge_attr:
+                    - Dictionary of edge attributes, each an array aligned
+                      with adj.data
+        """
+        self.ids = ids
+        self.adj = sp.csr_matrix(adj)
+        self.attr = dict(attr) if attr is not None else dict()
+        self.edge_attr = OrderedDict(edge_attr or {})
+        pass
+
+    def adjacency(self):
+        """
+        Returns the full, symmetric, adjacency matrix
+        """
+        return self.adj + self.adj.T
+
+    def to_networkx(self):
+        """
+        Builds the networkx graph which the gpickle or graphml formats would
+        have stored. Edges are keyed by integer labels, as in ndmg.graph.
+        """
+        g = nx.Graph(**self.attr)
+        g.add_nodes_from(self.ids)
+        ids = np.asarray(self.ids).astype(np.int64)
+        coo = self.adj.tocoo()
+        if not self.edge_attr:
+            g.add_weighted_edges_from(zip(ids[coo.row].tolist(),
+                                          ids[coo.col].tolist(),
+                                          coo.data.tolist()))
+            return g
+        names = list(self.edge_attr.keys())
+        values = zip(*[np.asarray(x).tolist()
+                       for x in self.edge_attr.values()])
+        g.add_edges_from((a, b, dict([('weight', w)] + list(zip(names, v))))
+                         for a, b, w, v in zip(ids[coo.row].tolist(),
+                                               ids[coo.col].tolist(),
+                                               coo.data.tolist(), values))
+        return g
+
+
+def node_ids(nodes):
+    """
+    Converts networkx node names, which are strings when read from graphml,
+    to numeric labels. Labels which are all integral are returned as int64.
+
+    **Positional Arguments:**
+
+            nodes:
+                - List of node names
+    """
+    ids = np.array([float(n) for n in nodes])
+    if np.all(ids == np.round(ids)):
+        return ids.astype(np.int64)
+    return ids
+
+
+def from_networkx(g):
+    """
+    Builds a sparse_graph from a networkx graph with numeric node names.
+    Numeric edge attributes other than the weight are kept as edge
+    attributes.
+
+    **Positional Arguments:**
+
+            g:
+                - networkx graph
+    """
+    nodes = list(g.nodes())
+    ids = node_ids(nodes)
+    order = np.argsort(ids, kind='mergesort')
+    pos = dict(zip(nodes, np.argsort(order)))
+    ids = ids[order]
+    edges = list(g.edges(data=True))
+    names = sorted(set(k for u, v, d in edges for k in d
+                       if k != 'weight' and
+                       isinstance(d[k], (int, float, np.number))))
+    rows = np.array([pos[u] for u, v, d in edges], dtype=np.int64)
+    cols = np.array([pos[v] for u, v, d in edges], dtype=np.int64)
+    rows, cols = np.minimum(rows, cols), np.maximum(rows, cols)
+    n = len(ids)
+
+    # Attributes are given the same order as the CSR weights
+    csr = sp.coo_matrix((np.arange(1, len(edges) + 1), (rows, cols)),
+                        shape=(n, n)).tocsr()
+    csr.sort_indices()
+    idx = csr.data - 1
+    weight = np.array([d.get('weight', 1) for u, v, d in edges])
+    adj = sp.csr_matrix((weight[idx], csr.indices, csr.indptr), shape=(n, n))
+    edge_attr = OrderedDict(
+        (name, np.array([d.get(name, np.nan) for u, v, d in edges])[idx])
+        for name in names)
+    return sparse_graph(ids, adj, g.graph, edge_attr)
+
+
+def save_sparse_graph(fname, g, compress=True):
+    """
+    Saves a graph as the CSR arrays of the upper triangle of its adjacency
+    matrix (node IDs, indptr, indices, and uint32 weights) with its graph
+    attributes, in a single .npz file. Edge attributes are stored as float32
+    arrays aligned with the weights, named edge_<attribute>.
+
+    **Positional Arguments:**
+
+            fname:
+                - Filename for the graph
+            g:
+                - sparse_graph to be saved
+
+    **Optional Arguments:**
+
+            compress:
+                - Whether to compress the file. Uncompressed files can be
+                  memory-mapped when loaded.
+    """
+    arrays = dict(ids=np.asarray(g.ids),
+                  indptr=g.adj.indptr,
+                  indices=g.adj.indices,
+                  weight=g.adj.data.astype(np.uint32),
+                  attr=np.array(json.dumps(g.attr)),
+                  format=np.array(graph_marker))
+    for name, x in g.edge_attr.items():
+        arrays['edge_' + name] = np.asarray(x, dtype=np.float32)
+    if compress:
+        np.savez_compressed(fname, **arrays)
+    else:
+        np.savez(fname, **arrays)
+    pass
+
+
+def is_sparse_graph(fname):
+    """
+    Whether a .npz file holds a graph saved by save_sparse_graph. Graphs
+    carry a format marker; those saved before it was added are recognized
+    by their arrays, which other derivatives, such as cohorts of graphs, do
+    not share.
+
+    **Positional Arguments:**
+
+            fname:
+                - Name of the .npz file
+    """
+    with zipfile.ZipFile(fname) as zf:
+        names = set(n[:-4] for n in zf.namelist() if n.endswith('.npy'))
+        if 'format' in names:
+            with zf.open('format.npy') as fp:
+                return str(np.lib.format.read_array(fp)) == graph_marker
+        if not {'ids', 'indptr', 'indices', 'weight', 'attr'} <= names:
+            return False
+        if 'subjects' in names:
+            return False
+        ids, indptr = npy_shape(zf, 'ids'), npy_shape(zf, 'indptr')
+        return len(ids) == 1 and indptr == (ids[0] + 1,)
+
+
+def load_sparse_graph(fname, mmap=False):
+    """
+    Loads a graph stored in ndmg's compact (.npz) format, without building a
+    networkx graph
+
+    **Positional Arguments:**
+
+            fname:
+                - Name of the graph file
+
+    **Optional Arguments:**
+
+            mmap:
+                - Whether to memory-map the arrays of uncompressed files
+    """
+    arrays = load_npz(fname, mmap=mmap)
+    n = len(arrays['ids'])
+    adj = sp.csr_matrix((arrays['weight'], arrays['indices'],
+                         arrays['indptr']), shape=(n, n))
+    edge_attr = OrderedDict((key[5:], arrays[key]) for key in sorted(arrays)
+                            if key.startswith('edge_'))
+    return sparse_graph(arrays['ids'], adj, json.loads(str(arrays['attr'])),
+                        edge_attr)
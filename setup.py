@@ -24,7 +24,9 @@ setup(
         'console_scripts': [
             'ndmg_pipeline=ndmg.scripts.ndmg_pipeline:main',
             'ndmg_bids=ndmg.scripts.ndmg_bids:main',
-            'ndmg_cloud=ndmg.scripts.ndmg_cloud:main'
+            'ndmg_cloud=ndmg.scripts.ndmg_cloud:main',
+            'ndmg_cohort=ndmg.scripts.ndmg_cohort:main',
+            'ndmg_convert=ndmg.scripts.ndmg_convert:main'
     ]
     },
     version=VERSION,